@@ -8,9 +8,11 @@ setup(
         'google-api-python-client>=2.0.0',
         'google-auth-httplib2>=0.1.0',
         'google-auth-oauthlib>=0.4.0',
-        'schedule>=1.0.0',
         'pyyaml>=5.4.0',
     ],
+    extras_require={
+        'async': ['httpx>=0.23.0'],
+    },
     entry_points={
         'console_scripts': [
             'inbox-sanitizer=src.cli:main',
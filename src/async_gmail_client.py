@@ -0,0 +1,176 @@
+"""Asyncio interface to the Gmail REST API"""
+
+import asyncio
+
+from .budget import QUOTA_UNITS
+from .events import report_error
+from .gmail_client import (
+    ESTIMATE_FIELDS, LIST_FIELDS, MESSAGE_FIELDS, MODIFY_FIELDS, PAGE_SIZE
+)
+
+try:
+    import httpx
+except ImportError:  # optional: pip install inbox-sanitizer[async]
+    httpx = None
+
+GMAIL_API_URL = 'https://gmail.googleapis.com'
+
+class AsyncGmailClient:
+    """
+    GmailClient with coroutine methods.
+    
+    All requests go through one httpx.AsyncClient, so connections are
+    pooled and reused and thousands of calls can be in flight from one
+    thread. Results have the same shape as GmailClient's.
+    """
+    
+    def __init__(self, credentials, base_url=GMAIL_API_URL, max_connections=100):
+        """
+        Args:
+            credentials: google.oauth2 Credentials (see auth.get_credentials)
+            base_url: API root, overridable for tests
+            max_connections: Size of the HTTP connection pool
+        """
+        if httpx is None:
+            raise ImportError(
+                "AsyncGmailClient needs httpx. Install it with: "
+                "pip install inbox-sanitizer[async]"
+            )
+        self.credentials = credentials
+        self.user_id = 'me'
+        self.base = f"{base_url.rstrip('/')}/gmail/v1/users/{self.user_id}"
+        self.http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections
+            ),
+            timeout=30
+        )
+        self._refresh_lock = asyncio.Lock()
+        # Gmail quota units spent by this client
+        self.quota_used = 0
+        # Optional EventLog for errors; printed when unset
+        self.events = None
+    
+    async def close(self):
+        """Close pooled connections"""
+        await self.http.aclose()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        await self.close()
+    
+    async def _headers(self):
+        """Authorization header, refreshing the token once if it expired"""
+        if not self.credentials.valid:
+            async with self._refresh_lock:
+                if not self.credentials.valid:
+                    from google.auth.transport.requests import Request
+                    loop = asyncio.get_running_loop()
+                    await loop.run_in_executor(None, self.credentials.refresh, Request())
+        return {'Authorization': f"Bearer {self.credentials.token}"}
+    
+    async def _call(self, method, path, params=None, body=None, quota=None):
+        if quota:
+            self.quota_used += QUOTA_UNITS[quota]
+        response = await self.http.request(
+            method, self.base + path,
+            params=params, json=body, headers=await self._headers()
+        )
+        response.raise_for_status()
+        return response.json() if response.content else {}
+    
+    async def list_messages(self, query='', max_results=50):
+        """Coroutine version of GmailClient.list_messages"""
+        messages = []
+        page_token = None
+        try:
+            while len(messages) < max_results:
+                params = {
+                    'q': query,
+                    'maxResults': min(PAGE_SIZE, max_results - len(messages)),
+                    'fields': LIST_FIELDS
+                }
+                if page_token:
+                    params['pageToken'] = page_token
+                results = await self._call('GET', '/messages', params, quota='messages.list')
+                
+                messages.extend(results.get('messages', []))
+                page_token = results.get('nextPageToken')
+                if not page_token:
+                    break
+            
+            return messages[:max_results]
+        except Exception as e:
+            report_error(self.events, f"Error listing messages: {e}", query=query)
+            return messages
+    
+    async def estimate_count(self, query=''):
+        """Coroutine version of GmailClient.estimate_count"""
+        try:
+            results = await self._call('GET', '/messages', {
+                'q': query, 'maxResults': 1, 'fields': ESTIMATE_FIELDS
+            }, quota='messages.list')
+            return results.get('resultSizeEstimate', 0)
+        except Exception as e:
+            report_error(self.events, f"Error estimating {query!r}: {e}", query=query)
+            return 0
+    
+    async def get_message(self, msg_id):
+        """Coroutine version of GmailClient.get_message"""
+        try:
+            msg = await self._call('GET', f"/messages/{msg_id}", {
+                'format': 'metadata',
+                'metadataHeaders': ['From', 'Subject', 'Date'],
+                'fields': MESSAGE_FIELDS
+            }, quota='messages.get')
+            
+            # Extract headers
+            headers = {}
+            for header in msg['payload']['headers']:
+                headers[header['name']] = header['value']
+            
+            return {
+                'id': msg['id'],
+                'threadId': msg['threadId'],
+                'snippet': msg.get('snippet', ''),
+                'from': headers.get('From', ''),
+                'subject': headers.get('Subject', ''),
+                'date': headers.get('Date', '')
+            }
+        except Exception as e:
+            report_error(self.events, f"Error getting message {msg_id}: {e}", id=msg_id)
+            return None
+    
+    async def archive_message(self, msg_id):
+        """Coroutine version of GmailClient.archive_message"""
+        try:
+            await self._call('POST', f"/messages/{msg_id}/modify",
+                             {'fields': MODIFY_FIELDS}, {'removeLabelIds': ['INBOX']},
+                             quota='messages.modify')
+            return True
+        except Exception as e:
+            report_error(self.events, f"Error archiving {msg_id}: {e}", id=msg_id)
+            return False
+    
+    async def archive_thread(self, thread_id):
+        """Coroutine version of GmailClient.archive_thread"""
+        try:
+            await self._call('POST', f"/threads/{thread_id}/modify",
+                             {'fields': MODIFY_FIELDS}, {'removeLabelIds': ['INBOX']},
+                             quota='threads.modify')
+            return True
+        except Exception as e:
+            report_error(self.events, f"Error archiving thread {thread_id}: {e}", thread=thread_id)
+            return False
+    
+    async def delete_message(self, msg_id):
+        """Coroutine version of GmailClient.delete_message"""
+        try:
+            await self._call('DELETE', f"/messages/{msg_id}", quota='messages.delete')
+            return True
+        except Exception as e:
+            report_error(self.events, f"Error deleting {msg_id}: {e}", id=msg_id)
+            return False
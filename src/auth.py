@@ -1,30 +1,49 @@
 """OAuth2 authentication for Gmail with token refresh and error handling"""
 
 from typing import Optional, Dict, Any
+from datetime import datetime, timedelta, timezone
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build, build_from_document
+import json
 import os.path
 import pickle
 import logging
 
+from .utils import write_atomic
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Gmail API scopes
 SCOPES = ['https://www.googleapis.com/auth/gmail.modify']
-TOKEN_FILE = 'token.pickle'
+TOKEN_FILE = 'token.json'
 CREDENTIALS_FILE = 'credentials.json'
 
+# Read once and converted to TOKEN_FILE
+LEGACY_TOKEN_FILE = 'token.pickle'
+
+# Refresh access tokens that expire within this window
+REFRESH_MARGIN = timedelta(minutes=5)
+
+# Trimmed discovery documents, one file per API version
+DISCOVERY_CACHE_DIR = os.environ.get(
+    'INBOX_SANITIZER_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'inbox-sanitizer')
+)
+
+# Gmail resources the sanitizer calls; the rest of the API is left out
+GMAIL_RESOURCES = ('messages', 'threads')
+
 def get_service(provider: str = 'gmail') -> Optional[Any]:
     """
     Authenticate and return Gmail service client.
     
     This function handles:
-    - Loading existing credentials from token.pickle
-    - Refreshing expired tokens automatically
+    - Loading existing credentials from token.json (migrating token.pickle)
+    - Refreshing tokens that are expired or about to expire
     - Initiating new OAuth flow if needed
     - Saving credentials for future use
     
@@ -56,70 +75,204 @@ def _get_gmail_service() -> Optional[Any]:
     Returns:
         Gmail API service client or None if authentication fails
     """
-    creds = None
+    creds = get_credentials()
+    if not creds:
+        return None
     
-    # Load existing token if it exists
-    if os.path.exists(TOKEN_FILE):
+    # Build and return the Gmail service
+    try:
+        service = None
+        document = _discovery_document('gmail', 'v1')
+        if document is not None:
+            try:
+                service = build_from_document(document, credentials=creds)
+            except Exception as e:
+                # A bad cached document must not lock the user out; drop it
+                logger.warning(f"Cached discovery document unusable, rebuilding: {e}")
+                _remove_cached_document('gmail', 'v1')
+        if service is None:
+            service = build('gmail', 'v1', credentials=creds)
+        logger.info("Gmail API service initialized")
+        return service
+    except Exception as e:
+        logger.error(f"Failed to build Gmail service: {e}")
+        return None
+
+def _discovery_document(api: str, version: str) -> Optional[str]:
+    """
+    Discovery document for an API version, trimmed to the resources we call.
+    
+    The first call cuts the document bundled with google-api-python-client
+    down to GMAIL_RESOURCES and caches it in DISCOVERY_CACHE_DIR, so later
+    starts parse a fraction of the JSON and build fewer resource classes.
+    The cache file is named after the library version, so an upgrade
+    trims its own bundled document again.
+    
+    Returns:
+        Document JSON, or None to let build() find it
+    """
+    path = _discovery_cache_path(api, version)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        pass
+    
+    try:
+        from googleapiclient import discovery_cache
+        document = json.loads(discovery_cache.get_static_doc(api, version))
+        users = document['resources']['users']
+        users['resources'] = {
+            name: resource for name, resource in users['resources'].items()
+            if name in GMAIL_RESOURCES
+        }
+        text = json.dumps(document, separators=(',', ':'))
+    except Exception as e:
+        logger.warning(f"No bundled discovery document for {api} {version}: {e}")
+        return None
+    
+    try:
+        os.makedirs(DISCOVERY_CACHE_DIR, exist_ok=True)
+        write_atomic(path, text)
+    except OSError as e:
+        logger.warning(f"Could not cache discovery document: {e}")
+    return text
+
+def _discovery_cache_path(api: str, version: str) -> str:
+    """Cache file for an API version under the installed google-api-python-client"""
+    try:
+        from googleapiclient.version import __version__ as client_version
+    except ImportError:
+        client_version = 'unknown'
+    return os.path.join(DISCOVERY_CACHE_DIR, f"{api}.{version}.{client_version}.json")
+
+def _remove_cached_document(api: str, version: str) -> None:
+    """Delete a cached discovery document, if there is one"""
+    try:
+        os.remove(_discovery_cache_path(api, version))
+    except OSError:
+        pass
+
+def load_token(path: str = TOKEN_FILE) -> Optional[Credentials]:
+    """
+    Load stored credentials.
+    
+    A token.pickle left by older versions is read once, rewritten as
+    JSON at `path` and removed.
+    
+    Returns:
+        Credentials, or None if there is no usable token
+    """
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                info = json.load(f)
+            creds = Credentials.from_authorized_user_info(info, info.get('scopes') or SCOPES)
+            logger.info(f"Loaded existing credentials from {path}")
+            return creds
+        except Exception as e:
+            logger.error(f"Failed to load token file: {e}")
+            return None
+    
+    if os.path.exists(LEGACY_TOKEN_FILE):
         try:
-            with open(TOKEN_FILE, 'rb') as token:
+            with open(LEGACY_TOKEN_FILE, 'rb') as token:
                 creds = pickle.load(token)
-            logger.info("Loaded existing credentials from token.pickle")
         except Exception as e:
             logger.error(f"Failed to load token file: {e}")
-            creds = None
+            return None
+        if save_token(creds, path):
+            os.remove(LEGACY_TOKEN_FILE)
+            logger.info(f"Migrated {LEGACY_TOKEN_FILE} to {path}")
+        return creds
     
-    # Check if credentials are valid or can be refreshed
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            # Try to refresh the token
-            try:
-                logger.info("Refreshing expired access token...")
-                creds.refresh(Request())
-                logger.info("✓ Token refreshed successfully")
-            except Exception as e:
-                logger.error(f"✗ Token refresh failed: {e}")
-                logger.info("Will initiate new OAuth flow")
-                creds = None
-        
-        # If we still don't have valid creds, start new OAuth flow
-        if not creds:
-            if not os.path.exists(CREDENTIALS_FILE):
-                raise FileNotFoundError(
-                    f"Missing {CREDENTIALS_FILE}. "
-                    f"Download OAuth2 credentials from Google Cloud Console:\n"
-                    f"1. Go to https://console.cloud.google.com/\n"
-                    f"2. Enable Gmail API\n"
-                    f"3. Create OAuth2 credentials\n"
-                    f"4. Download and save as {CREDENTIALS_FILE}"
-                )
-            
-            try:
-                logger.info("Starting OAuth2 authentication flow...")
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    CREDENTIALS_FILE, SCOPES
-                )
-                creds = flow.run_local_server(port=0)
-                logger.info("✓ Authentication successful")
-            except Exception as e:
-                logger.error(f"✗ OAuth flow failed: {e}")
-                return None
-        
-        # Save credentials for future use
+    return None
+
+def save_token(creds: Credentials, path: str = TOKEN_FILE) -> bool:
+    """
+    Store credentials as JSON, readable only by the owner.
+    
+    Returns:
+        True if the token was written
+    """
+    try:
+        write_atomic(path, creds.to_json(), mode=0o600)
+        logger.info(f"Credentials saved to {path}")
+        return True
+    except Exception as e:
+        logger.error(f"Warning: Could not save credentials: {e}")
+        return False
+
+def _needs_refresh(creds: Credentials) -> bool:
+    """True if the access token is expired or expires within REFRESH_MARGIN"""
+    if not creds.valid:
+        return True
+    if creds.expiry is None:
+        return False
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return creds.expiry - now < REFRESH_MARGIN
+
+def get_credentials() -> Optional[Credentials]:
+    """
+    Load, refresh or obtain OAuth2 credentials for Gmail.
+    
+    Used directly by clients that talk to the REST API without a
+    discovery-built service, such as AsyncGmailClient.
+    
+    Returns:
+        Valid credentials, or None if authentication fails
+    
+    Raises:
+        FileNotFoundError: If a new OAuth flow is needed and credentials.json is missing
+    """
+    # Load existing token if it exists
+    creds = load_token()
+    
+    # A token that is still good is used as is, without touching the file
+    if creds and not _needs_refresh(creds):
+        return creds
+    
+    if creds and creds.refresh_token:
+        # Try to refresh the token
         try:
-            with open(TOKEN_FILE, 'wb') as token:
-                pickle.dump(creds, token)
-            logger.info(f"Credentials saved to {TOKEN_FILE}")
+            logger.info("Refreshing access token...")
+            creds.refresh(Request())
+            logger.info("✓ Token refreshed successfully")
+            save_token(creds)
+            return creds
         except Exception as e:
-            logger.error(f"Warning: Could not save credentials: {e}")
+            logger.error(f"✗ Token refresh failed: {e}")
+            if creds.valid:
+                # Not expired yet; try again next time
+                return creds
+            logger.info("Will initiate new OAuth flow")
+    
+    # No usable token: start a new OAuth flow
+    if not os.path.exists(CREDENTIALS_FILE):
+        raise FileNotFoundError(
+            f"Missing {CREDENTIALS_FILE}. "
+            f"Download OAuth2 credentials from Google Cloud Console:\n"
+            f"1. Go to https://console.cloud.google.com/\n"
+            f"2. Enable Gmail API\n"
+            f"3. Create OAuth2 credentials\n"
+            f"4. Download and save as {CREDENTIALS_FILE}"
+        )
     
-    # Build and return the Gmail service
     try:
-        service = build('gmail', 'v1', credentials=creds)
-        logger.info("Gmail API service initialized")
-        return service
+        logger.info("Starting OAuth2 authentication flow...")
+        flow = InstalledAppFlow.from_client_secrets_file(
+            CREDENTIALS_FILE, SCOPES
+        )
+        creds = flow.run_local_server(port=0)
+        logger.info("✓ Authentication successful")
     except Exception as e:
-        logger.error(f"Failed to build Gmail service: {e}")
+        logger.error(f"✗ OAuth flow failed: {e}")
         return None
+    
+    # Save credentials for future use
+    save_token(creds)
+    
+    return creds
 
 def test_connection(service: Any, provider: str = 'gmail') -> Dict[str, Any]:
     """
@@ -174,7 +327,7 @@ def test_connection(service: Any, provider: str = 'gmail') -> Dict[str, Any]:
 
 def revoke_credentials() -> bool:
     """
-    Revoke stored credentials and delete token file.
+    Revoke stored credentials and delete the token files.
     
     Useful for logging out or switching accounts.
     
@@ -182,13 +335,15 @@ def revoke_credentials() -> bool:
         True if credentials were successfully removed
     """
     try:
-        if os.path.exists(TOKEN_FILE):
-            os.remove(TOKEN_FILE)
-            logger.info(f"✓ Removed {TOKEN_FILE}")
-            return True
-        else:
+        removed = False
+        for path in (TOKEN_FILE, LEGACY_TOKEN_FILE):
+            if os.path.exists(path):
+                os.remove(path)
+                logger.info(f"✓ Removed {path}")
+                removed = True
+        if not removed:
             logger.info(f"{TOKEN_FILE} does not exist")
-            return False
+        return removed
     except Exception as e:
         logger.error(f"✗ Failed to remove credentials: {e}")
         return False
@@ -0,0 +1,61 @@
+"""Per-run limits on time, API quota and memory"""
+
+import time
+
+from .utils import current_rss_mb
+
+# Gmail API quota units per method
+# https://developers.google.com/gmail/api/reference/quota
+QUOTA_UNITS = {
+    'messages.list': 5,
+    'messages.get': 5,
+    'messages.modify': 5,
+    'messages.delete': 10,
+    'threads.modify': 10,
+}
+
+class RunBudget:
+    """
+    Limits for a single run_once call.
+    
+    Any limit left as None is not enforced. Call start() when the run
+    begins; exhausted() then reports which limit ran out, if any. Quota
+    is read from the client's `quota_used` counter, so only calls made
+    during this run count.
+    """
+    
+    def __init__(self, max_seconds=None, max_units=None, max_rss_mb=None):
+        self.max_seconds = max_seconds
+        self.max_units = max_units
+        self.max_rss_mb = max_rss_mb
+        self.clock = time.monotonic
+        self._started = None
+        self._client = None
+        self._units_at_start = 0
+    
+    def start(self, client):
+        """Begin measuring a run that uses this Gmail client"""
+        self._started = self.clock()
+        self._client = client
+        self._units_at_start = getattr(client, 'quota_used', 0)
+    
+    def units_used(self):
+        """Quota units spent since start()"""
+        return getattr(self._client, 'quota_used', 0) - self._units_at_start
+    
+    def exhausted(self):
+        """
+        Check the limits.
+        
+        Returns:
+            str naming the exhausted limit, or None if the run may continue
+        """
+        if self.max_seconds is not None and self.clock() - self._started >= self.max_seconds:
+            return f"time limit of {self.max_seconds}s"
+        if self.max_units is not None and self.units_used() >= self.max_units:
+            return f"quota limit of {self.max_units} units"
+        if self.max_rss_mb is not None:
+            rss = current_rss_mb()
+            if rss is not None and rss >= self.max_rss_mb:
+                return f"memory limit of {self.max_rss_mb} MB"
+        return None
@@ -1,12 +1,80 @@
 """Command line interface for inbox-sanitizer"""
 
 import argparse
+import asyncio
 import sys
 import os
-from .auth import get_service
+from .auth import get_credentials, get_service
+from .budget import RunBudget
+from .events import EventSummary, open_event_log
 from .gmail_client import GmailClient
 from .filters import FilterEngine
-from .scheduler import SanitizerScheduler
+from .local_source import LocalMailClient
+from .reputation import SenderReputation
+from .scheduler import AsyncSanitizerScheduler, SanitizerScheduler
+from .simulate import format_report, save_corpus, simulate
+from .skip_index import SkipIndex
+
+def _make_filters(args, events):
+    """FilterEngine for --config, with the --reputation table if given"""
+    filters = FilterEngine(args.config)
+    if args.reputation:
+        filters.use_reputation(SenderReputation(args.reputation, events=events))
+    return filters
+
+def _make_budget(args):
+    """RunBudget from --max-seconds/--max-units/--max-rss-mb, or None"""
+    if args.max_seconds is None and args.max_units is None and args.max_rss_mb is None:
+        return None
+    return RunBudget(args.max_seconds, args.max_units, args.max_rss_mb)
+
+def _make_skip_index(args, events):
+    """SkipIndex for --skip-index and --skip-index-capacity, or None"""
+    if not args.skip_index:
+        return None
+    return SkipIndex(args.skip_index, capacity=args.skip_index_capacity, events=events)
+
+def _report_examples(args):
+    """check lists every message it would archive; other commands a sample"""
+    return None if args.command == 'check' else 20
+
+def _print_summary(events, results, dry_run):
+    """Human report for check/clean, computed from the run's events"""
+    if not events.human:
+        return
+    print(events.summary.format())
+    if dry_run:
+        print(f"\nSummary: {results['archived']} of {results['processed']} would be archived")
+    else:
+        print(f"\nSummary: Archived {results['archived']} of {results['processed']} messages")
+
+async def _run_async(args, credentials, events):
+    """check/clean/daemon on the asyncio client (--concurrency)"""
+    from .async_gmail_client import AsyncGmailClient
+    
+    async with AsyncGmailClient(credentials, max_connections=args.concurrency) as gmail:
+        gmail.events = events
+        filters = _make_filters(args, events)
+        scheduler = AsyncSanitizerScheduler(gmail, filters, concurrency=args.concurrency)
+        scheduler.budget = _make_budget(args)
+        scheduler.events = events
+        scheduler.skip_index = _make_skip_index(args, events)
+        
+        if args.command == 'check':
+            if events.human:
+                print("DRY RUN - no messages will be modified")
+            results = await scheduler.run_once(max_messages=args.max, dry_run=True)
+            _print_summary(events, results, dry_run=True)
+        
+        elif args.command == 'clean':
+            results = await scheduler.run_once(max_messages=args.max, dry_run=False)
+            _print_summary(events, results, dry_run=False)
+        
+        elif args.command == 'daemon':
+            await scheduler.run_forever(
+                interval_minutes=args.interval,
+                min_interval_minutes=args.min_interval
+            )
 
 def main():
     parser = argparse.ArgumentParser(
@@ -21,17 +89,56 @@ Examples:
   inbox-sanitizer clean --max 200           # Process up to 200 messages
   inbox-sanitizer daemon                     # Run every hour
   inbox-sanitizer daemon --interval 30       # Run every 30 minutes
+  inbox-sanitizer daemon --min-interval 5    # Adapt between 5 and 60 minutes
+  inbox-sanitizer clean --workers 8          # Scan 8 date windows in parallel
+  inbox-sanitizer check --source mail.mbox   # Check an exported mbox/Maildir offline
+  inbox-sanitizer clean --concurrency 200    # Fetch 200 messages at once with asyncio
+  inbox-sanitizer daemon --max-seconds 300   # Cap each run at 5 minutes
+  inbox-sanitizer daemon --skip-index keep.bin  # Don't refetch messages already kept
+  inbox-sanitizer check --events -           # Print JSON-lines events instead of text
+  inbox-sanitizer daemon --events run.jsonl  # Log events to a file
+  inbox-sanitizer summary --events run.jsonl # Summarize a saved event log
+  inbox-sanitizer export --corpus c.jsonl --max 500000   # Save message metadata locally
+  inbox-sanitizer simulate --corpus c.jsonl --candidate new.yaml  # Compare configs offline
         """
     )
     
-    parser.add_argument('command', choices=['auth', 'test-auth', 'check', 'clean', 'daemon'],
+    parser.add_argument('command', choices=['auth', 'test-auth', 'check', 'clean', 'daemon',
+                                            'export', 'simulate', 'summary'],
                        help='What to do')
     parser.add_argument('--max', type=int, default=100,
                        help='Maximum messages to process')
     parser.add_argument('--interval', type=int, default=60,
-                       help='Minutes between runs (for daemon)')
+                       help='Minutes between runs, or the upper bound with --min-interval (for daemon)')
+    parser.add_argument('--min-interval', type=int, default=None,
+                       help='Shortest minutes between runs; the daemon adapts to how fast mail arrives')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Scan the inbox as this many parallel date windows '
+                            '(for simulate: processes, default one per CPU)')
+    parser.add_argument('--concurrency', type=int, default=0,
+                       help='Use the asyncio client with this many requests in flight (needs httpx)')
     parser.add_argument('--config', default='config/filters.yaml',
                        help='Path to filter config file')
+    parser.add_argument('--max-seconds', type=float, default=None,
+                       help='Stop a run after this many seconds and resume on the next one')
+    parser.add_argument('--max-units', type=int, default=None,
+                       help='Stop a run after spending this many Gmail quota units')
+    parser.add_argument('--max-rss-mb', type=float, default=None,
+                       help='Stop a run when process memory reaches this many MB')
+    parser.add_argument('--events', default='none',
+                       help="Write JSON-lines events to this file, '-' for stdout, or 'none'")
+    parser.add_argument('--reputation', default=None,
+                       help='Learn per-sender verdicts in this file and skip rules for known senders')
+    parser.add_argument('--skip-index', default=None,
+                       help='Remember kept messages in this file and skip them until they age')
+    parser.add_argument('--skip-index-capacity', type=int, default=65536,
+                       help='Kept messages to size a new skip index for; set it near your inbox size')
+    parser.add_argument('--source', default=None,
+                       help='Read a local mbox file or Maildir instead of Gmail (check/export only)')
+    parser.add_argument('--corpus', default='corpus.jsonl',
+                       help='Message metadata file written by export and read by simulate')
+    parser.add_argument('--candidate', action='append', default=[],
+                       help='Filter config to compare against --config (for simulate, repeatable)')
     
     args = parser.parse_args()
     
@@ -63,28 +170,103 @@ Examples:
             sys.exit(1)
         return
     
-    # For other commands, we need authenticated service
-    service = get_service()
-    if not service:
-        print("Not authenticated. Run 'inbox-sanitizer auth' first.")
-        sys.exit(1)
+    if args.command == 'simulate':
+        # Works entirely from the stored corpus, no Gmail access needed
+        if not args.candidate:
+            print("simulate needs at least one --candidate config")
+            sys.exit(1)
+        for path in [args.corpus, args.config] + args.candidate:
+            if not os.path.exists(path):
+                print(f"File not found: {path}")
+                sys.exit(1)
+        report = simulate(args.corpus, [args.config] + args.candidate,
+                          workers=args.workers if args.workers > 1 else None)
+        print(format_report(report))
+        return
     
-    # Initialize components
-    gmail = GmailClient(service)
-    filters = FilterEngine(args.config)
-    scheduler = SanitizerScheduler(gmail, filters)
+    if args.command == 'summary':
+        if not os.path.exists(args.events):
+            print(f"File not found: {args.events}")
+            sys.exit(1)
+        print(EventSummary.from_file(args.events).format())
+        return
     
-    if args.command == 'check':
-        print("DRY RUN - no messages will be modified")
-        results = scheduler.run_once(max_messages=args.max, dry_run=True)
-        print(f"\nSummary: {results['archived']} of {results['processed']} would be archived")
+    if args.concurrency > 0 and not args.source and args.command in ('check', 'clean', 'daemon'):
+        credentials = get_credentials()
+        if not credentials:
+            print("Not authenticated. Run 'inbox-sanitizer auth' first.")
+            sys.exit(1)
+        events = open_event_log(args.events, examples=_report_examples(args))
+        try:
+            asyncio.run(_run_async(args, credentials, events))
+        except ImportError as e:
+            print(e)
+            sys.exit(1)
+        except KeyboardInterrupt:
+            print("\nStopped")
+        finally:
+            events.close()
+        return
     
-    elif args.command == 'clean':
-        results = scheduler.run_once(max_messages=args.max, dry_run=False)
-        print(f"\nSummary: Archived {results['archived']} of {results['processed']} messages")
+    if args.source:
+        # Local archives are read-only and need no authentication
+        if args.command not in ('check', 'export'):
+            print("--source can only be used with 'check' or 'export'")
+            sys.exit(1)
+        try:
+            gmail = LocalMailClient(args.source)
+        except FileNotFoundError as e:
+            print(e)
+            sys.exit(1)
+        args.workers = 1
+    else:
+        # For other commands, we need authenticated service
+        service = get_service()
+        if not service:
+            print("Not authenticated. Run 'inbox-sanitizer auth' first.")
+            sys.exit(1)
+        
+        # Worker threads each need their own API client
+        gmail = GmailClient(service, service_factory=get_service if args.workers > 1 else None)
+    
+    if args.command == 'export':
+        if isinstance(gmail, LocalMailClient):
+            records = gmail.iter_messages()
+        else:
+            listed = gmail.list_messages(query='in:inbox', max_results=args.max)
+            records = (gmail.get_message(m['id']) for m in listed)
+        count = save_corpus(records, args.corpus)
+        print(f"Saved {count} messages to {args.corpus}")
+        return
+    
+    # Initialize components
+    events = open_event_log(args.events, examples=_report_examples(args))
+    gmail.events = events
+    filters = _make_filters(args, events)
+    scheduler = SanitizerScheduler(gmail, filters)
+    scheduler.budget = _make_budget(args)
+    scheduler.events = events
+    scheduler.skip_index = _make_skip_index(args, events)
     
-    elif args.command == 'daemon':
-        scheduler.run_forever(interval_minutes=args.interval)
+    try:
+        if args.command == 'check':
+            if events.human:
+                print("DRY RUN - no messages will be modified")
+            results = scheduler.run_once(max_messages=args.max, dry_run=True, workers=args.workers)
+            _print_summary(events, results, dry_run=True)
+        
+        elif args.command == 'clean':
+            results = scheduler.run_once(max_messages=args.max, dry_run=False, workers=args.workers)
+            _print_summary(events, results, dry_run=False)
+        
+        elif args.command == 'daemon':
+            scheduler.run_forever(
+                interval_minutes=args.interval,
+                workers=args.workers,
+                min_interval_minutes=args.min_interval
+            )
+    finally:
+        events.close()
 
 if __name__ == '__main__':
     main()
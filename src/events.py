@@ -0,0 +1,214 @@
+"""Structured run events, written as JSON lines off the hot path"""
+
+import json
+import queue
+import sys
+import threading
+import time
+from collections import Counter
+
+# Tells the writer thread to stop after what is queued
+_STOP = object()
+
+# Error messages kept for the report; the rest are only counted
+MAX_ERRORS = 20
+
+class EventSummary:
+    """
+    Running totals over a stream of events.
+    
+    This is where human-readable output comes from: the scheduler only
+    emits events, and reports are computed from the totals afterwards.
+    """
+    
+    def __init__(self, examples=20):
+        """
+        Args:
+            examples: Archive verdicts listed in the report, or None for all
+        """
+        self.verdicts = Counter()
+        self.rules = Counter()
+        self.actions = Counter()
+        self.errors = []
+        self.error_count = 0
+        self.examples = []
+        self.max_examples = examples
+        self.fetched = 0
+        self.fetch_ms = 0.0
+    
+    @classmethod
+    def from_file(cls, path, examples=20):
+        """Summarize a JSON-lines event log written by EventLog"""
+        summary = cls(examples)
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    summary.add(json.loads(line))
+        return summary
+    
+    def add(self, event):
+        """Count one event"""
+        kind = event.get('event')
+        if kind == 'message':
+            self.verdicts[event['verdict']] += 1
+            self.rules[event.get('rule', '')] += 1
+            if event.get('fetch_ms') is not None:
+                self.fetched += 1
+                self.fetch_ms += event['fetch_ms']
+            if event['verdict'] == 'archive' and (
+                    self.max_examples is None or len(self.examples) < self.max_examples):
+                self.examples.append(event)
+        elif kind == 'action':
+            self.actions[event['action']] += 1
+        elif kind == 'error':
+            self.error_count += 1
+            if len(self.errors) < MAX_ERRORS:
+                self.errors.append(event.get('message', ''))
+    
+    def format(self):
+        """Human-readable report of the totals"""
+        checked = sum(self.verdicts.values())
+        lines = [f"Checked {checked} messages: {self.verdicts['archive']} archive, "
+                 f"{self.verdicts['keep']} keep"]
+        if self.fetched:
+            lines.append(f"Average fetch: {self.fetch_ms / self.fetched:.1f} ms")
+        
+        for rule, count in sorted(self.rules.items(), key=lambda item: -item[1]):
+            lines.append(f"  {count:>8}  {rule}")
+        
+        if self.examples:
+            lines.append("")
+            for event in self.examples:
+                lines.append(f"  -> {event.get('subject', '')[:40]} ({event.get('rule', '')})")
+            if self.verdicts['archive'] > len(self.examples):
+                lines.append(f"  ... and {self.verdicts['archive'] - len(self.examples)} more")
+        
+        if self.actions:
+            lines.append("")
+            lines.append("API calls: " + ', '.join(
+                f"{count} {action}" for action, count in sorted(self.actions.items())
+            ))
+        
+        if self.error_count:
+            lines.append(f"\n{self.error_count} errors:")
+            lines.extend(f"  {message}" for message in self.errors)
+        
+        return '\n'.join(lines)
+
+class EventLog:
+    """
+    Collects run events and writes them as JSON lines.
+    
+    emit() only updates the summary and queues the event; a background
+    thread serializes whatever has queued up and writes it in one batch,
+    so no per-message write or flush happens in the scan loop. With no
+    output, events are only summarized.
+    """
+    
+    def __init__(self, output=None, batch_size=1000, owns_output=False, examples=20):
+        """
+        Args:
+            output: Writable text stream, or None to write nothing
+            batch_size: Most events serialized per write
+            owns_output: Close the stream in close()
+            examples: Archive verdicts the summary lists, or None for all
+        """
+        self.output = output
+        self.batch_size = batch_size
+        self.owns_output = owns_output
+        self.summary = EventSummary(examples)
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        if output is not None:
+            self._queue = queue.SimpleQueue()
+            self._thread = threading.Thread(target=self._write_batches, daemon=True)
+            self._thread.start()
+    
+    @property
+    def human(self):
+        """Whether plain-text progress lines may go to stdout"""
+        return self.output is not sys.stdout
+    
+    def emit(self, event, **fields):
+        """
+        Record one event.
+        
+        Args:
+            event: Event type ('message', 'action', 'error', 'run_start', ...)
+            **fields: JSON-serializable details
+        """
+        record = {'event': event, 'ts': round(time.time(), 3), **fields}
+        with self._lock:
+            self.summary.add(record)
+        if self._queue is not None:
+            self._queue.put(record)
+    
+    def error(self, message, **fields):
+        """Record an error; printed directly when nothing is written"""
+        self.emit('error', message=message, **fields)
+        if self.output is None:
+            print(message)
+    
+    def flush(self):
+        """Block until every event emitted so far is written"""
+        if self._queue is not None:
+            done = threading.Event()
+            self._queue.put(done)
+            done.wait()
+    
+    def close(self):
+        """Write what is queued and stop the writer thread"""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+            if self.owns_output:
+                self.output.close()
+    
+    def _write_batches(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            events = [e for e in batch if isinstance(e, dict)]
+            if events:
+                try:
+                    self.output.write(''.join(
+                        json.dumps(e, ensure_ascii=False) + '\n' for e in events
+                    ))
+                    self.output.flush()
+                except Exception as e:
+                    print(f"Error writing events: {e}", file=sys.stderr)
+            
+            for marker in batch:
+                if isinstance(marker, threading.Event):
+                    marker.set()
+            if _STOP in batch:
+                return
+
+def open_event_log(target, examples=20):
+    """
+    EventLog for a --events value.
+    
+    Args:
+        target: '-' for stdout, 'none' or None for no output, else a
+            file path to append to
+        examples: Archive verdicts the summary lists, or None for all
+    """
+    if not target or target == 'none':
+        return EventLog(examples=examples)
+    if target == '-':
+        return EventLog(sys.stdout, examples=examples)
+    return EventLog(open(target, 'a', encoding='utf-8'), owns_output=True, examples=examples)
+
+def report_error(events, message, **fields):
+    """Send an error to an event log, or print it when there is none"""
+    if events is not None:
+        events.error(message, **fields)
+    else:
+        print(message)
@@ -3,14 +3,67 @@
 import re
 import yaml
 import os
-from datetime import datetime, timedelta
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from email.utils import parseaddr
+from functools import lru_cache
+
+_WEEKDAYS = {'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'}
+_MONTHS = {name: number for number, name in enumerate(
+    ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'), 1)}
+
+# timezone objects by '+HHMM' string; a mailbox only has a handful
+_ZONES = {}
+
+@lru_cache(maxsize=4096)
+def _parse_date(value):
+    """
+    Parse a Date header. Cached: simulations evaluate each message once per config.
+    
+    The usual 'Tue, 14 Nov 2023 22:13:20 +0000' form is split by hand,
+    several times faster than strptime; anything else goes to strptime.
+    """
+    try:
+        weekday, day, month, year, clock, zone = value.split()
+        hour, minute, second = clock.split(':')
+        tz = _ZONES.get(zone)
+        if tz is None:
+            if len(zone) != 5 or zone[0] not in '+-':
+                raise ValueError(value)
+            offset = timedelta(hours=int(zone[1:3]), minutes=int(zone[3:]))
+            tz = _ZONES[zone] = timezone(-offset if zone[0] == '-' else offset)
+        if weekday[:3] not in _WEEKDAYS:
+            raise ValueError(value)
+        return datetime(int(year), _MONTHS[month], int(day), int(hour), int(minute),
+                        int(second), tzinfo=tz)
+    except (ValueError, KeyError):
+        return datetime.strptime(value, '%a, %d %b %Y %H:%M:%S %z')
+
+@lru_cache(maxsize=16)
+def _pattern_matcher(patterns):
+    """One regex that tells whether any of the lowercased patterns occurs, or None"""
+    if not patterns:
+        return None
+    return re.compile('|'.join(re.escape(pattern.lower()) for pattern in patterns))
+
+# Distinct From headers remembered before the sender cache starts over
+SENDER_CACHE_SIZE = 10000
 
 class FilterEngine:
     """Applies rules to decide if an email should be archived"""
     
     def __init__(self, config_file='config/filters.yaml'):
         self.config = self.load_config(config_file)
-        self.stats = {'checked': 0, 'archived': 0, 'kept': 0}
+        self.stats = {'checked': 0, 'archived': 0, 'kept': 0, 'sender_cache_hits': 0}
+        # Verdicts by From header as received, and by parsed address
+        self._header_verdicts = {}
+        self._sender_verdicts = {}
+        self._sender_rules = None
+        # Optional SenderReputation; see use_reputation()
+        self.reputation = None
+        # Fixed "now" for the age rule (aware datetime); None means the clock
+        self.now = None
     
     def load_config(self, config_file):
         """Load filter rules from YAML file"""
@@ -40,6 +93,21 @@ class FilterEngine:
         
         return default_config
     
+    def rules_hash(self):
+        """Stable fingerprint of the rule set, for invalidating learned state"""
+        rules = {k: v for k, v in self.config.items() if k != 'action'}
+        encoded = json.dumps(rules, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.sha1(encoded).hexdigest()
+    
+    def use_reputation(self, reputation):
+        """
+        Learn per-sender verdicts, for the scheduler's known-sender queries.
+        
+        The table is cleared if it was learned under different rules.
+        """
+        reputation.invalidate(self.rules_hash())
+        self.reputation = reputation
+    
     def should_archive(self, message):
         """
         Apply rules to determine if message should be archived.
@@ -48,45 +116,118 @@ class FilterEngine:
             (bool, str): True if should archive, with reason
         """
         self.stats['checked'] += 1
-        
-        # Check whitelist first (these are never archived)
-        from_addr = message.get('from', '').lower()
-        for domain in self.config['whitelist']:
-            if domain.lower() in from_addr:
-                self.stats['kept'] += 1
-                return False, f"whitelisted domain: {domain}"
-        
-        # Check blacklist
-        for domain in self.config['blacklist']:
-            if domain.lower() in from_addr:
-                self.stats['archived'] += 1
-                return True, f"blacklisted domain: {domain}"
+        verdict = self._apply_rules(message)
+        self.stats['archived' if verdict[0] else 'kept'] += 1
+        if self.reputation is not None:
+            self.reputation.record(message.get('from', ''), *verdict)
+        return verdict
+    
+    def _apply_rules(self, message):
+        """Run the configured rules in order; returns (bool, reason)"""
+        # Whitelist and blacklist depend only on the sender
+        verdict = self.sender_verdict(message.get('from', ''))
+        if verdict is not None:
+            return verdict
         
         # Check newsletter patterns
         subject = message.get('subject', '').lower()
         snippet = message.get('snippet', '').lower()
         combined = subject + ' ' + snippet
         
-        for pattern in self.config['newsletter_patterns']:
-            if pattern.lower() in combined:
-                self.stats['archived'] += 1
-                return True, f"newsletter pattern: {pattern}"
+        # Most messages match no pattern: one regex search rules them all out
+        patterns = self.config['newsletter_patterns']
+        matcher = _pattern_matcher(tuple(patterns))
+        if matcher is not None and matcher.search(combined):
+            for pattern in patterns:
+                if pattern.lower() in combined:
+                    return True, f"newsletter pattern: {pattern}"
         
         # Check age (if we have a date)
         if 'date' in message:
             try:
                 # This is simplified - real date parsing is more complex
-                msg_date = datetime.strptime(message['date'], '%a, %d %b %Y %H:%M:%S %z')
-                age_days = (datetime.now().astimezone() - msg_date).days
+                msg_date = _parse_date(message['date'])
+                now = self.now or datetime.now().astimezone()
+                age_days = (now - msg_date).days
                 if age_days > self.config['max_age_days']:
-                    self.stats['archived'] += 1
                     return True, f"older than {self.config['max_age_days']} days"
             except:
                 pass  # If date parsing fails, skip age check
         
-        self.stats['kept'] += 1
         return False, "no rules matched"
     
+    def keep_expiry(self, message, reason):
+        """
+        When a keep verdict could next change, as epoch seconds.
+        
+        Sender, subject and snippet never change, so only the age rule
+        can turn a kept message into an archived one: from the first
+        moment it is more than max_age_days whole days old.
+        
+        Returns:
+            float, or None if the verdict holds for as long as the rules do
+            (whitelisted senders, messages without a parseable date)
+        """
+        if 'whitelisted' in reason:
+            return None
+        try:
+            msg_date = _parse_date(message['date'])
+        except Exception:
+            return None
+        return msg_date.timestamp() + (self.config['max_age_days'] + 1) * 86400
+    
+    def sender_verdict(self, from_header):
+        """
+        Whitelist/blacklist verdict for a From header, decided once per sender.
+        
+        The lists are matched against the lowercased address, not the
+        display name. Results are cached by the header as received, which
+        is a plain dict lookup, and by the address, so a new display name
+        for a known sender costs one parseaddr but no domain scans. The
+        caches are dropped whenever the whitelist or blacklist changes.
+        
+        Returns:
+            (bool, str) like should_archive, or None if neither list matches
+        """
+        rules = (tuple(self.config['whitelist']), tuple(self.config['blacklist']))
+        if rules != self._sender_rules:
+            self._sender_rules = rules
+            self._header_verdicts = {}
+            self._sender_verdicts = {}
+        
+        if from_header in self._header_verdicts:
+            self.stats['sender_cache_hits'] += 1
+            return self._header_verdicts[from_header]
+        if len(self._header_verdicts) >= SENDER_CACHE_SIZE:
+            self._header_verdicts = {}
+        
+        # Headers without a parseable address are matched as they are
+        from_addr = parseaddr(from_header or '')[1].lower() or (from_header or '').lower()
+        if from_addr in self._sender_verdicts:
+            self.stats['sender_cache_hits'] += 1
+            verdict = self._header_verdicts[from_header] = self._sender_verdicts[from_addr]
+            return verdict
+        
+        verdict = None
+        # Check whitelist first (these are never archived)
+        for domain in self.config['whitelist']:
+            if domain.lower() in from_addr:
+                verdict = (False, f"whitelisted domain: {domain}")
+                break
+        
+        # Check blacklist
+        if verdict is None:
+            for domain in self.config['blacklist']:
+                if domain.lower() in from_addr:
+                    verdict = (True, f"blacklisted domain: {domain}")
+                    break
+        
+        if len(self._sender_verdicts) >= SENDER_CACHE_SIZE:
+            self._sender_verdicts = {}
+        self._sender_verdicts[from_addr] = verdict
+        self._header_verdicts[from_header] = verdict
+        return verdict
+    
     def reset_stats(self):
         """Clear counters"""
-        self.stats = {'checked': 0, 'archived': 0, 'kept': 0}
+        self.stats = {'checked': 0, 'archived': 0, 'kept': 0, 'sender_cache_hits': 0}
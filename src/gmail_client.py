@@ -2,19 +2,66 @@
 
 import base64
 from email.message import EmailMessage
+import threading
 import time
 
+from .budget import QUOTA_UNITS
+from .events import report_error
+
+# Gmail returns at most this many IDs per list page
+PAGE_SIZE = 500
+
+# Partial-response masks: ask only for what the sanitizer reads
+LIST_FIELDS = 'messages(id,threadId),nextPageToken'
+ESTIMATE_FIELDS = 'resultSizeEstimate'
+MESSAGE_FIELDS = 'id,threadId,snippet,payload/headers(name,value)'
+MODIFY_FIELDS = 'id'
+
 class GmailClient:
     """Simple interface to Gmail"""
     
-    def __init__(self, service):
-        self.service = service
+    def __init__(self, service, service_factory=None):
+        """
+        Args:
+            service: Authenticated Gmail API service
+            service_factory: Optional callable returning a fresh service.
+                The API client is not thread-safe, so worker threads use
+                this to get their own service. Without it every thread
+                shares `service`.
+        """
+        self._service = service
+        self.service_factory = service_factory
         self.user_id = 'me'
+        self._local = threading.local()
+        # Gmail quota units spent by this client
+        self.quota_used = 0
+        self._quota_lock = threading.Lock()
+        # Optional EventLog for errors; printed when unset
+        self.events = None
+    
+    @property
+    def service(self):
+        """Service for the calling thread"""
+        if self.service_factory is None or threading.current_thread() is threading.main_thread():
+            return self._service
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = self.service_factory() or self._service
+            self._local.service = service
+        return service
+    
+    def _charge(self, method):
+        """Count the quota cost of one API call"""
+        with self._quota_lock:
+            self.quota_used += QUOTA_UNITS[method]
     
     def list_messages(self, query='', max_results=50):
         """
         Get messages matching a query.
         
+        Follows page tokens until max_results IDs are collected or the
+        result set runs out.
+        
         Args:
             query: Gmail search syntax (e.g., 'is:unread')
             max_results: Maximum number to return
@@ -22,26 +69,136 @@ class GmailClient:
         Returns:
             List of message objects with id, threadId, snippet
         """
+        messages = []
+        page_token = None
         try:
+            while len(messages) < max_results:
+                params = {
+                    'userId': self.user_id,
+                    'q': query,
+                    'maxResults': min(PAGE_SIZE, max_results - len(messages)),
+                    'fields': LIST_FIELDS
+                }
+                if page_token:
+                    params['pageToken'] = page_token
+                self._charge('messages.list')
+                results = self.service.users().messages().list(**params).execute()
+                
+                messages.extend(results.get('messages', []))
+                page_token = results.get('nextPageToken')
+                if not page_token:
+                    break
+            
+            return messages[:max_results]
+        except Exception as e:
+            report_error(self.events, f"Error listing messages: {e}", query=query)
+            return messages
+    
+    def estimate_count(self, query=''):
+        """Gmail's resultSizeEstimate for a query (one cheap list call)"""
+        try:
+            self._charge('messages.list')
             results = self.service.users().messages().list(
                 userId=self.user_id,
                 q=query,
-                maxResults=max_results
+                maxResults=1,
+                fields=ESTIMATE_FIELDS
             ).execute()
-            
-            return results.get('messages', [])
+            return results.get('resultSizeEstimate', 0)
         except Exception as e:
-            print(f"Error listing messages: {e}")
-            return []
+            report_error(self.events, f"Error estimating {query!r}: {e}", query=query)
+            return 0
+    
+    def partition_query(self, query='', workers=4, max_results=None,
+                        lookback_days=3650, now=None, stop=None):
+        """
+        Split a query into disjoint date windows of similar size.
+        
+        The range from `lookback_days` ago up to now is bisected, newest
+        half first, until each window's resultSizeEstimate is at most the
+        per-worker share, so busy periods get narrow windows and quiet
+        ones wide windows. With `max_results`, bisecting stops as soon as
+        the finished windows hold that many messages, and everything older
+        becomes one open-ended window. Otherwise anything older than the
+        lookback lands in one open-ended window. When what is to be listed
+        fits in one page, the query is returned whole: a single list call
+        beats any number of estimates.
+        
+        Windows use epoch seconds: `after:{start - 1} before:{end}` covers
+        [start, end), so neighbouring windows never overlap.
+        
+        Args:
+            query: Base Gmail query (e.g., 'in:inbox')
+            workers: Number of workers the windows will be spread across
+            max_results: If set, only the newest this many messages need
+                their own windows
+            lookback_days: Oldest point that gets bisected
+            now: Epoch seconds for the top of the range (default: now)
+            stop: Optional callable checked before each estimate; once it
+                returns true, the ranges not yet estimated become windows
+                as they are
+        
+        Returns:
+            List of Gmail query strings, newest window first
+        """
+        now = int(now if now is not None else time.time())
+        end = now + 86400
+        start = now - lookback_days * 86400
+        
+        def window(lo, hi):
+            terms = [query] if query else []
+            if lo is not None:
+                terms.append(f"after:{lo - 1}")
+            terms.append(f"before:{hi}")
+            return ' '.join(terms)
+        
+        if stop is not None and stop():
+            return [window(None, end)]
+        
+        total = self.estimate_count(query)
+        if max_results:
+            total = min(total, max_results)
+        if total <= PAGE_SIZE:
+            # One page lists it all; bisecting would only add estimate calls
+            return [query]
+        target = max(1, -(-total // max(1, workers)))
+        
+        windows = []
+        covered = 0
+        pending = [(start, end)]
+        while pending:
+            if max_results and covered >= max_results:
+                # The newest windows already hold enough; lump the rest together
+                windows.append(window(None, pending[-1][1]))
+                return windows
+            if stop is not None and stop():
+                while pending:
+                    windows.append(window(*pending.pop()))
+                break
+            lo, hi = pending.pop()
+            estimate = self.estimate_count(window(lo, hi))
+            if hi - lo > 86400 and estimate > target:
+                mid = lo + (hi - lo) // 2
+                # Push older half first so newer windows pop first
+                pending.append((lo, mid))
+                pending.append((mid, hi))
+            else:
+                windows.append(window(lo, hi))
+                covered += estimate
+        
+        windows.append(window(None, start))
+        return windows
     
     def get_message(self, msg_id):
         """Get full message details including headers"""
         try:
+            self._charge('messages.get')
             msg = self.service.users().messages().get(
                 userId=self.user_id,
                 id=msg_id,
                 format='metadata',
-                metadataHeaders=['From', 'Subject', 'Date']
+                metadataHeaders=['From', 'Subject', 'Date'],
+                fields=MESSAGE_FIELDS
             ).execute()
             
             # Extract headers
@@ -58,30 +215,48 @@ class GmailClient:
                 'date': headers.get('Date', '')
             }
         except Exception as e:
-            print(f"Error getting message {msg_id}: {e}")
+            report_error(self.events, f"Error getting message {msg_id}: {e}", id=msg_id)
             return None
     
     def archive_message(self, msg_id):
         """Remove message from inbox"""
         try:
+            self._charge('messages.modify')
             self.service.users().messages().modify(
                 userId=self.user_id,
                 id=msg_id,
-                body={'removeLabelIds': ['INBOX']}
+                body={'removeLabelIds': ['INBOX']},
+                fields=MODIFY_FIELDS
+            ).execute()
+            return True
+        except Exception as e:
+            report_error(self.events, f"Error archiving {msg_id}: {e}", id=msg_id)
+            return False
+    
+    def archive_thread(self, thread_id):
+        """Remove every message in a thread from inbox with one call"""
+        try:
+            self._charge('threads.modify')
+            self.service.users().threads().modify(
+                userId=self.user_id,
+                id=thread_id,
+                body={'removeLabelIds': ['INBOX']},
+                fields=MODIFY_FIELDS
             ).execute()
             return True
         except Exception as e:
-            print(f"Error archiving {msg_id}: {e}")
+            report_error(self.events, f"Error archiving thread {thread_id}: {e}", thread=thread_id)
             return False
     
     def delete_message(self, msg_id):
         """Permanently delete message"""
         try:
+            self._charge('messages.delete')
             self.service.users().messages().delete(
                 userId=self.user_id,
                 id=msg_id
             ).execute()
             return True
         except Exception as e:
-            print(f"Error deleting {msg_id}: {e}")
+            report_error(self.events, f"Error deleting {msg_id}: {e}", id=msg_id)
             return False
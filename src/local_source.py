@@ -0,0 +1,244 @@
+"""Read exported mail archives (mbox or Maildir) as a local message source"""
+
+import mmap
+import os
+import re
+from email.header import decode_header, make_header
+from email.utils import parseaddr
+
+from .events import report_error
+
+# End of a header block, for LF or CRLF line endings
+_BLANK_LINE = re.compile(rb'\r?\n\r?\n')
+
+# An mbox From_ line: "From <sender> <date>", the date ending in a time and a year
+_SEPARATOR = re.compile(rb'From \S+ +[^\r\n]*\d\d:\d\d[^\r\n]* \d{4}\b')
+
+# `from:(a OR b ...)` or `from:a` in a Gmail query
+_FROM_QUERY = re.compile(r'from:(?:\(([^)]*)\)|(\S+))', re.IGNORECASE)
+
+# Headers FilterEngine needs, plus the Takeout ones for threads and labels
+WANTED_HEADERS = {
+    name.lower(): name
+    for name in ('From', 'Subject', 'Date', 'X-GM-THRID', 'X-Gmail-Labels')
+}
+
+def _parse_headers(block):
+    """
+    Pull the wanted headers out of a raw header block.
+    
+    Much cheaper than email.parser, which builds a full Message object
+    and keeps every header. Folded continuation lines are joined; the
+    first occurrence of a header wins.
+    """
+    headers = {}
+    name = None
+    for line in block.decode('utf-8', 'replace').splitlines():
+        if line[:1] in (' ', '\t'):
+            if name in headers:
+                headers[name] += ' ' + line.strip()
+            continue
+        key, sep, value = line.partition(':')
+        name = WANTED_HEADERS.get(key.strip().lower()) if sep else None
+        if name is not None and name not in headers:
+            headers[name] = value.strip()
+        elif name is not None:
+            name = None
+    return headers
+
+def _decode(value):
+    """Decode RFC 2047 encoded words, leaving plain headers untouched"""
+    if value is None:
+        return ''
+    if '=?' not in value:
+        return value
+    try:
+        return str(make_header(decode_header(value)))
+    except Exception:
+        return value
+
+def _in_inbox(headers):
+    """Takeout lists labels in X-Gmail-Labels; no header means unlabelled"""
+    labels = headers.get('X-Gmail-Labels')
+    return labels is None or 'inbox' in [l.strip() for l in labels.lower().split(',')]
+
+class LocalMailClient:
+    """
+    Read-only stand-in for GmailClient over an mbox file or Maildir.
+    
+    Only message headers are parsed; bodies are skipped, so `snippet` is
+    always empty. mbox files are memory-mapped and message IDs are byte
+    offsets into the file, which makes get_message a seek rather than a
+    rescan. Maildir IDs are the message file names.
+    
+    Records have the same shape as GmailClient.get_message, so
+    SanitizerScheduler and FilterEngine run over them unchanged.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self._mmap = None
+        self._offsets = None
+        # Optional EventLog for errors; printed when unset
+        self.events = None
+        if os.path.isdir(path):
+            self.kind = 'maildir'
+        elif os.path.isfile(path):
+            self.kind = 'mbox'
+        else:
+            raise FileNotFoundError(f"No mbox file or Maildir at {path}")
+    
+    def close(self):
+        """Release the memory map"""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+    
+    # GmailClient interface
+    
+    def list_messages(self, query='', max_results=50):
+        """
+        List archived messages.
+        
+        Only `in:inbox` and `from:` are understood. With `in:inbox`,
+        Takeout messages whose X-Gmail-Labels lack "Inbox" are skipped;
+        archives without label headers are treated as all-inbox. `from:`
+        takes one address or an `(a OR b ...)` group, matched exactly.
+        
+        Returns:
+            List of dicts with id and threadId
+        """
+        inbox_only = 'in:inbox' in query.lower()
+        senders = None
+        match = _FROM_QUERY.search(query)
+        if match:
+            senders = {s.strip().lower() for s in (match.group(1) or match.group(2)).split(' OR ')}
+        messages = []
+        for msg_id, headers in self._scan():
+            if len(messages) >= max_results:
+                break
+            if inbox_only and not _in_inbox(headers):
+                continue
+            if senders is not None and parseaddr(_decode(headers.get('From')))[1].lower() not in senders:
+                continue
+            messages.append({'id': msg_id, 'threadId': headers.get('X-GM-THRID') or msg_id})
+        return messages
+    
+    def get_message(self, msg_id):
+        """Parse one message's headers into the GmailClient record format"""
+        try:
+            if self.kind == 'mbox':
+                return self._record(msg_id, self._mbox_headers(int(msg_id, 16)))
+            return self._record(msg_id, self._maildir_headers(msg_id))
+        except Exception as e:
+            report_error(self.events, f"Error reading message {msg_id}: {e}", id=msg_id)
+            return None
+    
+    def archive_message(self, msg_id):
+        """Archives are read-only"""
+        report_error(self.events, f"Cannot archive {msg_id}: {self.path} is a read-only archive", id=msg_id)
+        return False
+    
+    def archive_thread(self, thread_id):
+        """Archives are read-only"""
+        report_error(self.events, f"Cannot archive thread {thread_id}: {self.path} is a read-only archive",
+                     id=thread_id)
+        return False
+    
+    def delete_message(self, msg_id):
+        """Archives are read-only"""
+        report_error(self.events, f"Cannot delete {msg_id}: {self.path} is a read-only archive", id=msg_id)
+        return False
+    
+    # Streaming
+    
+    def iter_messages(self):
+        """
+        Yield every message's record, in file order.
+        
+        This is the fast path for large archives: each message's headers
+        are parsed exactly once.
+        """
+        for msg_id, headers in self._scan():
+            yield self._record(msg_id, headers)
+    
+    def _scan(self):
+        """Yield (id, parsed headers) for every message"""
+        if self.kind == 'mbox':
+            for offset in self._mbox_offsets():
+                yield f"{offset:x}", self._mbox_headers(offset)
+        else:
+            for key in self._maildir_keys():
+                yield key, self._maildir_headers(key)
+    
+    def _record(self, msg_id, headers):
+        return {
+            'id': msg_id,
+            'threadId': headers.get('X-GM-THRID') or msg_id,
+            'snippet': '',
+            'from': _decode(headers.get('From')),
+            'subject': _decode(headers.get('Subject')),
+            'date': headers.get('Date') or ''
+        }
+    
+    # mbox
+    
+    def _map(self):
+        if self._mmap is None:
+            with open(self.path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return b''
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+    
+    def _mbox_offsets(self):
+        """
+        Byte offsets of each "From " separator line.
+        
+        Not every exporter escapes body lines that start with "From ", so
+        a separator is only accepted at the start of the file or after a
+        blank line, and only if it looks like a From_ line with a date.
+        """
+        if self._offsets is None:
+            data = self._map()
+            offsets = []
+            if _SEPARATOR.match(data):
+                offsets.append(0)
+            pos = data.find(b'\nFrom ')
+            while pos != -1:
+                pos += 1
+                if data[pos - 2:pos] == b'\n\n' or data[pos - 3:pos] == b'\n\r\n':
+                    if _SEPARATOR.match(data, pos):
+                        offsets.append(pos)
+                pos = data.find(b'\nFrom ', pos)
+            self._offsets = offsets
+        return self._offsets
+    
+    def _mbox_headers(self, offset):
+        """Parse the header block of the message starting at offset"""
+        data = self._map()
+        start = data.find(b'\n', offset) + 1
+        blank = _BLANK_LINE.search(data, start)
+        end = blank.start() if blank else len(data)
+        return _parse_headers(data[start:end])
+    
+    # Maildir
+    
+    def _maildir_keys(self):
+        keys = []
+        for sub in ('new', 'cur'):
+            folder = os.path.join(self.path, sub)
+            if os.path.isdir(folder):
+                keys.extend(os.path.join(sub, name) for name in sorted(os.listdir(folder))
+                            if not name.startswith('.'))
+        return keys
+    
+    def _maildir_headers(self, key):
+        """Read lines up to the first blank one and parse them"""
+        lines = []
+        with open(os.path.join(self.path, key), 'rb') as f:
+            for line in f:
+                if line in (b'\n', b'\r\n'):
+                    break
+                lines.append(line)
+        return _parse_headers(b''.join(lines))
@@ -0,0 +1,120 @@
+"""Learned per-sender verdicts that let known senders skip rule evaluation"""
+
+import json
+import os
+import time
+from email.utils import parseaddr
+from functools import lru_cache
+
+from .events import report_error
+from .utils import write_atomic
+
+# Rules whose verdicts depend on the sender alone
+SENDER_RULES = ('whitelisted', 'blacklisted')
+
+@lru_cache(maxsize=10000)
+def _address(from_header):
+    """Lowercased address; cached, as the same few headers recur on every run"""
+    return parseaddr(from_header)[1].lower()
+
+class SenderReputation:
+    """
+    Persistent table of how often each sender's messages were archived or kept.
+    
+    Once a sender has been archived at least `min_messages` times, the
+    scheduler turns it into a Gmail `from:` query so its messages are
+    archived without a metadata fetch at all.
+    
+    Only verdicts of the sender rules (whitelist and blacklist) are
+    counted. Newsletter and age verdicts depend on the message, not the
+    sender: a colleague whose old mail aged out must not have their new
+    mail archived unread. Sender rules give every message from an address
+    the same verdict, so a sender's counts never disagree.
+    
+    The table is tied to a hash of the rule set and starts over when the
+    rules change. It holds at most `max_senders` entries; the least
+    recently seen are evicted first.
+    """
+    
+    def __init__(self, path='sender_reputation.json', min_messages=10,
+                 max_senders=50000, events=None):
+        self.path = path
+        # Optional EventLog for errors; printed when unset
+        self.events = events
+        self.rules_hash = None
+        self.min_messages = min_messages
+        self.max_senders = max_senders
+        self.senders = {}
+        self.load()
+    
+    @staticmethod
+    def address(from_header):
+        """Lowercased email address from a From header"""
+        return _address(from_header or '')
+    
+    def load(self):
+        """Read the table and the hash of the rules it was learned under"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            report_error(self.events, f"Error loading sender reputation {self.path}: {e}")
+            return
+        self.rules_hash = data.get('rules_hash')
+        self.senders = data.get('senders', {})
+    
+    def save(self):
+        """Write the table atomically, so a crash never leaves half a file"""
+        if not self.path:
+            return
+        try:
+            write_atomic(self.path, json.dumps({'rules_hash': self.rules_hash, 'senders': self.senders}))
+        except Exception as e:
+            report_error(self.events, f"Error saving sender reputation {self.path}: {e}")
+    
+    def invalidate(self, rules_hash):
+        """Forget everything if the rule set changed"""
+        if rules_hash != self.rules_hash:
+            self.rules_hash = rules_hash
+            self.senders = {}
+    
+    def record(self, from_header, should_archive, reason):
+        """Count one verdict for the message's sender, if a sender rule gave it"""
+        if not reason.startswith(SENDER_RULES):
+            return
+        addr = self.address(from_header)
+        if not addr:
+            return
+        entry = self.senders.get(addr)
+        if entry is None:
+            if len(self.senders) >= self.max_senders:
+                self._evict()
+            entry = self.senders[addr] = {'archive': 0, 'keep': 0, 'rule': '', 'seen': 0}
+        entry['archive' if should_archive else 'keep'] += 1
+        entry['rule'] = reason
+        entry['seen'] = int(time.time())
+    
+    def archive_senders(self, limit=None):
+        """
+        Addresses whose messages are always archived, most recently seen first.
+        
+        Args:
+            limit: Return at most this many addresses (None for all)
+        """
+        senders = [
+            addr for addr, entry in self.senders.items()
+            # Tables saved before only sender rules were counted may hold others
+            if entry['archive'] >= self.min_messages and not entry['keep']
+            and entry['rule'].startswith('blacklisted')
+        ]
+        senders.sort(key=lambda addr: (self.senders[addr]['seen'], self.senders[addr]['archive']),
+                     reverse=True)
+        return senders if limit is None else senders[:limit]
+    
+    def _evict(self):
+        """Drop the least recently seen tenth of the table"""
+        oldest = sorted(self.senders, key=lambda addr: self.senders[addr]['seen'])
+        for addr in oldest[:max(1, len(oldest) // 10)]:
+            del self.senders[addr]
@@ -1,9 +1,86 @@
 """Run inbox cleaning on a schedule"""
 
+import asyncio
+import threading
 import time
-import schedule
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from .events import EventLog
+from .gmail_client import PAGE_SIZE
+from .filters import _parse_date
+
+# Known senders folded into one `from:(a OR b ...)` query
+SENDERS_PER_QUERY = 20
+
+# Known-sender queries made per run; each costs a list call even when it finds nothing
+KNOWN_SENDER_QUERIES = 5
+
+# Seconds of clock difference with Gmail allowed for when asking for arrivals
+CLOCK_SKEW = 300
+
+class AdaptiveInterval:
+    """
+    Picks the gap between daemon runs from how fast mail arrives.
+    
+    Each tick reports how many new messages it saw and how long it took.
+    The arrival rate is smoothed, and the next interval is the time it
+    should take for `target_new` messages to arrive, clamped to
+    [min_minutes, max_minutes]. A tick never gets less than
+    `cost_factor` times its own duration of idle time, so slow sweeps
+    back off on their own. Quiet inboxes double the interval each
+    empty tick until they reach the maximum.
+    """
+    
+    def __init__(self, min_minutes=5, max_minutes=60, target_new=25,
+                 cost_factor=4, smoothing=0.5, history=100):
+        self.min_minutes = min(min_minutes, max_minutes)
+        self.max_minutes = max_minutes
+        self.target_new = target_new
+        self.cost_factor = cost_factor
+        self.smoothing = smoothing
+        self.current = max_minutes
+        self.rate = None  # new messages per minute
+        self.history = deque(maxlen=history)
+    
+    def update(self, new_messages, elapsed_minutes, tick_seconds):
+        """
+        Record one tick and choose the next interval.
+        
+        Args:
+            new_messages: Messages seen for the first time this tick
+            elapsed_minutes: Time since the previous tick started
+            tick_seconds: How long this tick took
+        
+        Returns:
+            float: Minutes until the next run
+        """
+        if elapsed_minutes > 0:
+            observed = new_messages / elapsed_minutes
+            if self.rate is None:
+                self.rate = observed
+            else:
+                self.rate = self.smoothing * observed + (1 - self.smoothing) * self.rate
+        
+        if self.rate:
+            interval = self.target_new / self.rate
+        else:
+            interval = self.current * 2
+        
+        interval = max(interval, tick_seconds * self.cost_factor / 60)
+        self.current = min(self.max_minutes, max(self.min_minutes, interval))
+        self.history.append(round(self.current, 2))
+        return self.current
+    
+    def stats(self):
+        """Current interval, smoothed rate and recent choices"""
+        return {
+            'interval_minutes': round(self.current, 2),
+            'arrival_rate_per_minute': round(self.rate or 0, 3),
+            'recent_intervals': list(self.history)
+        }
+
 class SanitizerScheduler:
     """Runs the cleaning process at regular intervals"""
     
@@ -11,76 +88,671 @@ class SanitizerScheduler:
         self.gmail = gmail_client
         self.filters = filter_engine
         self.runs_completed = 0
+        self._lock = threading.Lock()
+        # Date of the newest message any run has fetched, as epoch seconds
+        self._newest = None
+        self.interval = None
+        # Optional RunBudget limiting each run_once
+        self.budget = None
+        # Listed messages a budget-limited run did not get to
+        self._pending = []
+        # Optional SkipIndex of kept messages that need no fetch until they age
+        self.skip_index = None
+        # Per-message verdicts, API calls and run stats go here, not to print
+        self.events = EventLog()
+        # Swappable so tests can drive run_forever without real waits
+        self.clock = time.monotonic
+        self.sleep = time.sleep
     
-    def run_once(self, max_messages=100, dry_run=False):
+    def run_once(self, max_messages=100, dry_run=False, workers=1):
         """
         Process one batch of messages.
         
         Args:
             max_messages: Maximum to check in this run
             dry_run: If True, only report what would be done
+            workers: If above 1, scan date windows of the inbox in parallel
         
         Returns:
             dict: Stats from this run
         """
-        print(f"\n[{datetime.now().strftime('%H:%M:%S')}] Checking inbox...")
+        started, wall_started = self._begin_run(max_messages, dry_run)
         
-        # Get unread messages
-        messages = self.gmail.list_messages(query='in:inbox', max_results=max_messages)
+        # Messages from senders that are always archived need no fetch
+        known = self._archive_known_senders(max_messages, dry_run)
+        handled = {m['id'] for m in known}
+        remaining = max_messages - len(known)
         
-        if not messages:
-            print("No messages found")
-            return {'processed': 0, 'archived': 0}
+        messages, decisions, unprocessed, skipped = [], [], [], []
+        complete = True
+        resumed = bool(self._pending)
+        if remaining > 0 and workers > 1 and not resumed:
+            messages, decisions, unprocessed, skipped = self._scan_partitioned(
+                remaining, workers, skip=handled
+            )
+            complete = len(messages) + len(unprocessed) + len(skipped) < remaining
+        elif remaining > 0:
+            if resumed:
+                query = self._fresh_query()
+                fresh = self.gmail.list_messages(query=query, max_results=remaining) if query else []
+                listed = self._resume(fresh, remaining)
+                complete = False
+            else:
+                # Get unread messages
+                listed = self.gmail.list_messages(query='in:inbox', max_results=remaining)
+                # A short listing means every inbox message of every thread was seen
+                complete = len(listed) < remaining
+            messages, skipped = self._split_skipped([m for m in listed if m['id'] not in handled])
+            for i, msg_data in enumerate(messages):
+                if self._budget_exhausted():
+                    messages, unprocessed = messages[:i], messages[i:]
+                    break
+                decisions.append(self._evaluate(msg_data))
         
-        print(f"Found {len(messages)} messages in inbox")
+        self._save_learned(decisions)
         
-        archived_count = 0
-        for msg_data in messages:
-            # Get full message details
-            msg = self.gmail.get_message(msg_data['id'])
-            if not msg:
-                continue
-            
-            # Apply filters
-            should_archive, reason = self.filters.should_archive(msg)
-            
-            if should_archive:
-                archived_count += 1
-                subject = msg.get('subject', 'No subject')[:40]
-                if dry_run:
-                    print(f"  Would archive: {subject} ({reason})")
-                else:
-                    self.gmail.archive_message(msg['id'])
-                    print(f"  Archived: {subject} ({reason})")
+        if not messages and not known and not unprocessed and not skipped:
+            self._say("No messages found")
+            return self._finish({'processed': 0, 'archived': 0}, started)
+        
+        self._say(f"Found {len(messages) + len(known) + len(unprocessed) + len(skipped)} "
+                  f"messages in inbox")
+        new_count = self._count_new(decisions)
+        
+        stopped = None
+        if unprocessed:
+            # Unseen messages may share threads with decided ones
+            complete = False
+            stopped = self._stop_early(unprocessed)
+        
+        # Archives for everything already decided still go out. Skipped
+        # messages count as listed, so their threads are not archived whole.
+        archived_count, actions = self._apply(messages + skipped, decisions, complete, dry_run,
+                                              since=wall_started)
+        return self._end_run(started, messages, known, skipped, archived_count, actions,
+                             new_count, stopped, dry_run)
+    
+    def _begin_run(self, max_messages, dry_run):
+        """
+        Announce a run and prepare its budget and skip index.
         
+        Returns:
+            (perf_counter start, wall clock start)
+        """
+        started = time.perf_counter()
+        wall_started = time.time()
+        self._say(f"\n[{datetime.now().strftime('%H:%M:%S')}] Checking inbox...")
+        self.events.emit('run_start', max_messages=max_messages, dry_run=dry_run)
+        
+        if self.budget is not None:
+            self.budget.start(self.gmail)
+        if self.skip_index is not None:
+            self.skip_index.invalidate(self.filters.rules_hash())
+            self.skip_index.expire()
+        return started, wall_started
+    
+    def _end_run(self, started, messages, known, skipped, archived_count, actions,
+                 new_count, stopped, dry_run):
+        """
+        Count a finished run and emit its stats.
+        
+        Args:
+            archived_count, actions: From the rules' archives; the known
+                senders' are added here
+        """
+        processed = len(messages) + len(known)
+        archived_count += len(known)
+        if not dry_run:
+            actions += len(known)
         self.runs_completed += 1
         
-        return {
-            'processed': len(messages),
+        return self._finish({
+            'processed': processed,
             'archived': archived_count,
-            'kept': len(messages) - archived_count,
+            'kept': processed - archived_count,
+            'new': new_count,
+            'skipped': len(skipped),
+            'actions': actions,
+            'stopped': stopped,
+            'pending': len(self._pending),
             'dry_run': dry_run
-        }
+        }, started)
+    
+    def _say(self, text):
+        """Print a progress line, unless stdout carries the event stream"""
+        if self.events.human:
+            print(text)
+    
+    def _finish(self, results, started):
+        """Emit the run_end event and hand back the run's stats"""
+        self.events.emit('run_end', duration_ms=round((time.perf_counter() - started) * 1000, 1),
+                         **results)
+        return results
+    
+    def _record(self, msg, should_archive, reason, fetch_ms=None, filter_ms=None):
+        """Emit the verdict for one message"""
+        self.events.emit(
+            'message', id=msg['id'], thread=msg.get('threadId'),
+            sender=msg.get('from', ''), subject=msg.get('subject', ''),
+            verdict='archive' if should_archive else 'keep', rule=reason,
+            fetch_ms=fetch_ms, filter_ms=filter_ms
+        )
+    
+    def _budget_exhausted(self):
+        """Name of the exhausted run limit, or None"""
+        return self.budget.exhausted() if self.budget is not None else None
     
-    def run_forever(self, interval_minutes=60):
+    def _fresh_query(self):
+        """Query for inbox mail dated after anything fetched so far, or None"""
+        if self._newest is None or self._budget_exhausted():
+            return None
+        return f"in:inbox after:{int(self._newest)}"
+    
+    def _resume(self, fresh, remaining):
         """
-        Run continuously at specified interval.
+        What a run resuming the backlog processes, taken off the backlog.
+        
+        Mail that arrived since the last run goes first, then the backlog
+        the last budget-limited run left.
         
         Args:
-            interval_minutes: How often to check inbox
+            fresh: Listing for _fresh_query (empty if there was none)
         """
-        print(f"Starting inbox sanitizer (checking every {interval_minutes} minutes)")
-        print("Press Ctrl+C to stop")
+        pending = {m['id'] for m in self._pending}
+        fresh = [m for m in fresh if m['id'] not in pending]
+        listed = fresh + self._pending[:remaining - len(fresh)]
+        self._pending = self._pending[remaining - len(fresh):]
+        return listed
+    
+    def _stop_early(self, unprocessed):
+        """
+        Put messages the run budget cut off back on the backlog.
         
-        # Run once immediately
-        self.run_once()
+        The backlog only lives in memory, so only the daemon resumes it;
+        a one-shot run just says how much it did not get to.
         
-        # Schedule future runs
-        schedule.every(interval_minutes).minutes.do(self.run_once)
+        Returns:
+            Name of the limit that was reached
+        """
+        stopped = self._budget_exhausted() or 'run budget'
+        self._pending = unprocessed + self._pending
+        self.events.emit('stopped', reason=stopped, pending=len(self._pending))
+        if self.interval is not None:
+            self._say(f"Stopping early ({stopped} reached); "
+                      f"{len(self._pending)} messages left for the next run")
+        else:
+            self._say(f"Stopping early ({stopped} reached); "
+                      f"{len(self._pending)} listed messages were not checked. "
+                      f"Run again to check them.")
+        return stopped
+    
+    def _save_learned(self, decisions):
+        """Save the reputation table, and this run's keeps to the skip index"""
+        if self.filters.reputation is not None:
+            self.filters.reputation.save()
+        self._index_keeps(decisions)
+    
+    def _split_skipped(self, listed):
+        """Separate out messages the skip index says are still kept"""
+        if self.skip_index is None:
+            return listed, []
+        messages, skipped = [], []
+        for msg_data in listed:
+            (skipped if msg_data['id'] in self.skip_index else messages).append(msg_data)
+        return messages, skipped
+    
+    def _index_keeps(self, decisions):
+        """Add this run's kept messages to the skip index and save it"""
+        if self.skip_index is None:
+            return
+        for decision in decisions:
+            if decision and not decision[1]:
+                msg, _, reason = decision
+                self.skip_index.add(msg['id'], self.filters.keep_expiry(msg, reason))
+        self.skip_index.save()
+    
+    def _known_sender_queries(self):
+        """
+        `from:` queries for the senders the reputation table always archives.
         
+        Only the KNOWN_SENDER_QUERIES * SENDERS_PER_QUERY most recently seen
+        senders are queried, so a large table costs a bounded number of
+        list calls per run. Mail from the others is fetched and decided by
+        the rules, which records those senders as seen again.
+        """
+        reputation = self.filters.reputation
+        if reputation is None:
+            return []
+        senders = reputation.archive_senders(KNOWN_SENDER_QUERIES * SENDERS_PER_QUERY)
+        return ['in:inbox from:(' + ' OR '.join(senders[i:i + SENDERS_PER_QUERY]) + ')'
+                for i in range(0, len(senders), SENDERS_PER_QUERY)]
+    
+    def _archive_known_senders(self, max_messages, dry_run):
+        """
+        Archive inbox mail from senders the reputation table always archives.
+        
+        The senders are folded into `from:` queries, so these messages are
+        listed and archived without fetching their metadata or running
+        the rules. Listing and archiving stop when the run budget runs
+        out; whatever was not archived is left for the rules or a later run.
+        
+        Returns:
+            List of the listed messages that were handled
+        """
+        listed = []
+        for query in self._known_sender_queries():
+            if len(listed) >= max_messages or self._budget_exhausted():
+                break
+            listed.extend(self.gmail.list_messages(query=query, max_results=max_messages - len(listed)))
+        
+        handled = []
+        for msg_data in listed:
+            if not dry_run:
+                if self._budget_exhausted():
+                    break
+                self._call('message', msg_data['id'])
+            self._record(msg_data, True, 'known sender')
+            handled.append(msg_data)
+        return handled
+    
+    def _count_new(self, decisions):
+        """
+        How many fetched messages are dated after the newest one earlier runs fetched.
+        
+        Arrivals are measured by date rather than by which IDs are listed:
+        once newer mail is archived, older backlog slides into the listing
+        without being new. Messages archived by sender are never fetched,
+        so they have no date and are not counted.
+        """
+        dates = []
+        for decision in decisions:
+            if decision:
+                try:
+                    dates.append(_parse_date(decision[0]['date']).timestamp())
+                except Exception:
+                    pass
+        newest = self._newest
+        if dates:
+            # A Date header from the future must not hide later arrivals
+            self._newest = min(max(dates + [newest or 0]), time.time())
+        if newest is None:
+            return len(dates)
+        return sum(1 for date in dates if date > newest)
+    
+    def _evaluate(self, msg_data):
+        """
+        Fetch and filter one listed message.
+        
+        Returns:
+            (message, should_archive, reason), or None if the fetch failed
+        """
+        # Get full message details
+        fetch_start = time.perf_counter()
+        msg = self.gmail.get_message(msg_data['id'])
+        if not msg:
+            return None
+        
+        # Apply filters
+        filter_start = time.perf_counter()
+        with self._lock:
+            should_archive, reason = self.filters.should_archive(msg)
+        self._record(msg, should_archive, reason,
+                     fetch_ms=round((filter_start - fetch_start) * 1000, 2),
+                     filter_ms=round((time.perf_counter() - filter_start) * 1000, 3))
+        return msg, should_archive, reason
+    
+    def _plan(self, messages, decisions, complete, dry_run, changed_threads=()):
+        """
+        Decide which archive calls to make, a whole thread at a time where possible.
+        
+        A thread is archived with one threads().modify call when every one
+        of its inbox messages was listed and matched. Otherwise, or when
+        the listing was cut off by max_messages (so unseen inbox messages
+        of the thread might need keeping), messages are archived one by one.
+        
+        Args:
+            changed_threads: Thread IDs known to have gained inbox mail
+                since listing; these are always archived per message
+        
+        Returns:
+            (archived count, list of ('thread' | 'message', id) calls to make)
+        """
+        listed_per_thread = Counter(m.get('threadId') for m in messages)
+        by_thread = {}
+        for decision in decisions:
+            if decision and decision[1]:
+                msg = decision[0]
+                by_thread.setdefault(msg.get('threadId'), []).append(decision)
+        
+        archived_count = 0
+        calls = []
+        for thread_id, matched in by_thread.items():
+            whole_thread = (complete and thread_id and len(matched) > 1
+                            and len(matched) == listed_per_thread[thread_id]
+                            and thread_id not in changed_threads)
+            for msg, _, reason in matched:
+                archived_count += 1
+                if not whole_thread and not dry_run:
+                    calls.append(('message', msg['id']))
+            if whole_thread and not dry_run:
+                calls.append(('thread', thread_id))
+        return archived_count, calls
+    
+    def _arrivals_query(self, since):
+        """Query for inbox mail received after `since` (epoch seconds)"""
+        return f"in:inbox after:{int(since) - CLOCK_SKEW}"
+    
+    def _threads_with_arrivals(self, calls, messages, arrivals):
+        """
+        Planned whole-thread archives whose thread gained mail the run never listed.
+        
+        threads().modify archives a thread as it is when the call is made,
+        so a reply that arrived after listing would be archived unread.
+        A full page of arrivals may hide more, so then every thread counts.
+        """
+        threads = {item_id for kind, item_id in calls if kind == 'thread'}
+        if len(arrivals) >= PAGE_SIZE:
+            return threads
+        listed = {m['id'] for m in messages}
+        return threads & {m.get('threadId') for m in arrivals if m['id'] not in listed}
+    
+    def _replan(self, messages, decisions, complete, dry_run, plan, arrivals):
+        """_plan again if threads in `plan` gained mail listed in `arrivals`"""
+        changed = self._threads_with_arrivals(plan[1], messages, arrivals)
+        if not changed:
+            return plan
+        return self._plan(messages, decisions, complete, dry_run, changed)
+    
+    def _apply(self, messages, decisions, complete, dry_run, since=None):
+        """
+        Archive the messages that matched (see _plan).
+        
+        Args:
+            since: When listing began, as epoch seconds; threads that
+                received mail after it are archived per message
+        
+        Returns:
+            (archived count, number of archive API calls)
+        """
+        plan = self._plan(messages, decisions, complete, dry_run)
+        if since is not None and any(kind == 'thread' for kind, _ in plan[1]):
+            arrivals = self.gmail.list_messages(query=self._arrivals_query(since),
+                                                max_results=PAGE_SIZE)
+            plan = self._replan(messages, decisions, complete, dry_run, plan, arrivals)
+        archived_count, calls = plan
+        for kind, item_id in calls:
+            self._call(kind, item_id)
+        return archived_count, len(calls)
+    
+    def _call(self, kind, item_id):
+        """Archive one message or thread and emit the action event"""
+        call_start = time.perf_counter()
+        if kind == 'thread':
+            ok = self.gmail.archive_thread(item_id)
+        else:
+            ok = self.gmail.archive_message(item_id)
+        self.events.emit('action', action=f"archive_{kind}", id=item_id, ok=ok,
+                         ms=round((time.perf_counter() - call_start) * 1000, 2))
+        return ok
+    
+    def _scan_partitioned(self, max_messages, workers, skip=()):
+        """
+        List, fetch and filter disjoint date windows of the inbox concurrently.
+        
+        Each worker lists one window and evaluates its messages straight
+        away, so listing and fetching overlap. IDs are claimed in a shared
+        set, which keeps the merged result free of duplicates and caps the
+        whole run at max_messages.
+        
+        Args:
+            skip: IDs already handled this run
+        
+        Returns:
+            (listed messages, decisions, messages left unprocessed because
+            the run budget ran out, messages skipped as known keeps)
+        """
+        windows = self.gmail.partition_query(
+            'in:inbox', workers=workers, max_results=max_messages,
+            stop=self._budget_exhausted
+        )
+        seen = set(skip)
+        messages = []
+        decisions = []
+        unprocessed = []
+        skipped = []
+        
+        def claim(msg_data):
+            with self._lock:
+                if (msg_data['id'] in seen
+                        or len(messages) + len(unprocessed) + len(skipped) >= max_messages):
+                    return False
+                seen.add(msg_data['id'])
+                if self.skip_index is not None and msg_data['id'] in self.skip_index:
+                    skipped.append(msg_data)
+                    return False
+                if self._budget_exhausted():
+                    unprocessed.append(msg_data)
+                    return False
+                messages.append(msg_data)
+                return True
+        
+        def claimed():
+            with self._lock:
+                return len(messages) + len(unprocessed) + len(skipped)
+        
+        def scan(query):
+            # Windows are handed out newest first; once the cap is reached
+            # the older ones are not listed at all
+            wanted = max_messages - claimed()
+            if wanted <= 0:
+                return
+            for msg_data in self.gmail.list_messages(query=query, max_results=wanted):
+                if claim(msg_data):
+                    decision = self._evaluate(msg_data)
+                    with self._lock:
+                        decisions.append(decision)
+        
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(scan, windows))
+        
+        if messages:
+            self._say(f"Scanned {len(windows)} date windows")
+        return messages, decisions, unprocessed, skipped
+    
+    def run_forever(self, interval_minutes=60, workers=1, min_interval_minutes=None):
+        """
+        Run continuously, adapting the interval to the inbox arrival rate.
+        
+        Args:
+            interval_minutes: Longest gap between runs (and the first gap)
+            workers: Parallel date windows per run (see run_once)
+            min_interval_minutes: Shortest gap between runs. Defaults to
+                interval_minutes, which keeps the interval fixed.
+        """
+        self._start_daemon(interval_minutes, min_interval_minutes)
+        
+        last_start = None
         try:
             while True:
-                schedule.run_pending()
-                time.sleep(10)
+                started = self.clock()
+                results = self.run_once(workers=workers)
+                self._say_results(results)
+                delay = self._next_delay(results, started, last_start)
+                last_start = started
+                self.sleep(delay)
         except KeyboardInterrupt:
-            print(f"\nStopped after {self.runs_completed} runs")
+            self._say(f"\nStopped after {self.runs_completed} runs")
+    
+    def _start_daemon(self, interval_minutes, min_interval_minutes):
+        """Set up the adaptive interval and announce the daemon"""
+        if min_interval_minutes is None:
+            min_interval_minutes = interval_minutes
+        self.interval = AdaptiveInterval(min_interval_minutes, interval_minutes)
+        
+        if min_interval_minutes < interval_minutes:
+            self._say(f"Starting inbox sanitizer (checking every {min_interval_minutes}-{interval_minutes} minutes)")
+        else:
+            self._say(f"Starting inbox sanitizer (checking every {interval_minutes} minutes)")
+        self._say("Press Ctrl+C to stop")
+    
+    def _say_results(self, results):
+        """One progress line for what a daemon run did"""
+        if not results['processed'] and not results.get('skipped'):
+            return
+        line = f"Archived {results['archived']} of {results['processed']} messages"
+        if results.get('skipped'):
+            line += f", skipped {results['skipped']} already kept"
+        self._say(line)
+    
+    def _next_delay(self, results, started, last_start):
+        """Feed one tick into the adaptive interval; seconds to sleep until the next run"""
+        finished = self.clock()
+        elapsed = (started - last_start) / 60 if last_start is not None else 0
+        next_minutes = self.interval.update(
+            results.get('new', 0), elapsed, finished - started
+        )
+        self.events.emit('schedule', next_minutes=round(next_minutes, 2))
+        self._say(f"Next run in {next_minutes:.1f} minutes")
+        
+        # Sleep until the next run is due instead of polling
+        due = started + next_minutes * 60
+        return max(0, due - self.clock())
+
+class AsyncSanitizerScheduler(SanitizerScheduler):
+    """
+    SanitizerScheduler driven by asyncio and an AsyncGmailClient.
+    
+    Every listed message is fetched concurrently on one thread, with at
+    most `concurrency` requests in flight at once.
+    """
+    
+    def __init__(self, gmail_client, filter_engine, concurrency=500):
+        super().__init__(gmail_client, filter_engine)
+        self.concurrency = concurrency
+        self._semaphore = None
+        self.sleep = asyncio.sleep
+    
+    async def run_once(self, max_messages=100, dry_run=False, workers=1):
+        """
+        Coroutine version of SanitizerScheduler.run_once.
+        
+        `workers` is accepted for compatibility and ignored: concurrency
+        comes from the event loop instead of threads.
+        """
+        started, wall_started = self._begin_run(max_messages, dry_run)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        
+        # Messages from senders that are always archived need no fetch
+        known = await self._archive_known_senders(max_messages, dry_run)
+        handled = {m['id'] for m in known}
+        remaining = max_messages - len(known)
+        
+        listed = []
+        resumed = bool(self._pending)
+        if remaining > 0 and resumed:
+            query = self._fresh_query()
+            fresh = await self.gmail.list_messages(query=query, max_results=remaining) if query else []
+            listed = self._resume(fresh, remaining)
+        elif remaining > 0:
+            listed = await self.gmail.list_messages(query='in:inbox', max_results=remaining)
+        messages, skipped = self._split_skipped([m for m in listed if m['id'] not in handled])
+        
+        if not messages and not known and not skipped:
+            self._say("No messages found")
+            return self._finish({'processed': 0, 'archived': 0}, started)
+        
+        self._say(f"Found {len(messages) + len(known) + len(skipped)} messages in inbox")
+        not_run = object()
+        
+        async def evaluate(msg_data):
+            async with self._semaphore:
+                if self._budget_exhausted():
+                    return not_run
+                fetch_start = time.perf_counter()
+                msg = await self.gmail.get_message(msg_data['id'])
+            if not msg:
+                return None
+            filter_start = time.perf_counter()
+            should_archive, reason = self.filters.should_archive(msg)
+            self._record(msg, should_archive, reason,
+                         fetch_ms=round((filter_start - fetch_start) * 1000, 2),
+                         filter_ms=round((time.perf_counter() - filter_start) * 1000, 3))
+            return msg, should_archive, reason
+        
+        async def call(kind, item_id):
+            async with self._semaphore:
+                return await self._call(kind, item_id)
+        
+        decisions = await asyncio.gather(*(evaluate(m) for m in messages))
+        unprocessed = [m for m, d in zip(messages, decisions) if d is not_run]
+        messages = [m for m, d in zip(messages, decisions) if d is not not_run]
+        decisions = [d for d in decisions if d is not not_run]
+        new_count = self._count_new(decisions)
+        self._save_learned(decisions)
+        
+        complete = not resumed and len(listed) < remaining
+        stopped = None
+        if unprocessed:
+            complete = False
+            stopped = self._stop_early(unprocessed)
+        
+        plan = self._plan(messages + skipped, decisions, complete, dry_run)
+        if any(kind == 'thread' for kind, _ in plan[1]):
+            arrivals = await self.gmail.list_messages(query=self._arrivals_query(wall_started),
+                                                      max_results=PAGE_SIZE)
+            plan = self._replan(messages + skipped, decisions, complete, dry_run, plan, arrivals)
+        archived_count, calls = plan
+        await asyncio.gather(*(call(kind, item_id) for kind, item_id in calls))
+        return self._end_run(started, messages, known, skipped, archived_count, len(calls),
+                             new_count, stopped, dry_run)
+    
+    async def _archive_known_senders(self, max_messages, dry_run):
+        """Coroutine version of SanitizerScheduler._archive_known_senders"""
+        listed = []
+        for query in self._known_sender_queries():
+            if len(listed) >= max_messages or self._budget_exhausted():
+                break
+            listed.extend(await self.gmail.list_messages(
+                query=query, max_results=max_messages - len(listed)
+            ))
+        
+        async def archive(msg_data):
+            async with self._semaphore:
+                if self._budget_exhausted():
+                    return False
+                await self._call('message', msg_data['id'])
+            return True
+        
+        if not dry_run:
+            done = await asyncio.gather(*(archive(m) for m in listed))
+            listed = [m for m, ok in zip(listed, done) if ok]
+        for msg_data in listed:
+            self._record(msg_data, True, 'known sender')
+        return listed
+    
+    async def _call(self, kind, item_id):
+        """Coroutine version of SanitizerScheduler._call"""
+        call_start = time.perf_counter()
+        if kind == 'thread':
+            ok = await self.gmail.archive_thread(item_id)
+        else:
+            ok = await self.gmail.archive_message(item_id)
+        self.events.emit('action', action=f"archive_{kind}", id=item_id, ok=ok,
+                         ms=round((time.perf_counter() - call_start) * 1000, 2))
+        return ok
+    
+    async def run_forever(self, interval_minutes=60, workers=1, min_interval_minutes=None):
+        """Coroutine version of SanitizerScheduler.run_forever"""
+        self._start_daemon(interval_minutes, min_interval_minutes)
+        
+        last_start = None
+        try:
+            while True:
+                started = self.clock()
+                results = await self.run_once()
+                self._say_results(results)
+                delay = self._next_delay(results, started, last_start)
+                last_start = started
+                await self.sleep(delay)
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            self._say(f"\nStopped after {self.runs_completed} runs")
@@ -0,0 +1,307 @@
+"""Compact index of kept message IDs, so later runs need not fetch them again"""
+
+import bisect
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import time
+from array import array
+from collections import Counter
+
+from .events import report_error
+from .utils import write_atomic
+
+# Slots per cuckoo bucket
+BUCKET_SLOTS = 4
+
+# Displacements tried before an insert gives up on a table
+MAX_KICKS = 500
+
+# A table takes no new entries past this fill ratio
+MAX_LOAD = 0.9
+
+# Expiry code for keep verdicts that only a rule change can undo
+PERMANENT = 0xFFFF
+
+HOUR = 3600
+
+class _CuckooTable:
+    """
+    Cuckoo filter table of 32-bit slots: a 16-bit fingerprint and a 16-bit expiry code.
+    
+    Each key has two candidate buckets, the second derived from the
+    first and the fingerprint, so entries can be moved between them
+    without knowing the key.
+    """
+    
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.slots = array('I', bytes(4 * buckets * BUCKET_SLOTS))
+        self.count = 0
+        # (bucket, slot value) pairs that could not be placed
+        self.stash = []
+    
+    @property
+    def full(self):
+        return self.count >= MAX_LOAD * self.buckets * BUCKET_SLOTS or bool(self.stash)
+    
+    def _alt(self, bucket, fp):
+        """The other bucket for a fingerprint; applying it twice gives `bucket` back"""
+        return (fp * 0x5bd1e995 - bucket) % self.buckets
+    
+    def matches(self, index, fp):
+        """Slot positions (or stash entries) holding this fingerprint"""
+        first = index % self.buckets
+        second = self._alt(first, fp)
+        found = []
+        for bucket in (first, second):
+            start = bucket * BUCKET_SLOTS
+            for pos in range(start, start + BUCKET_SLOTS):
+                if self.slots[pos] >> 16 == fp:
+                    found.append(pos)
+        for i, (bucket, value) in enumerate(self.stash):
+            if value >> 16 == fp and bucket in (first, second):
+                found.append(-1 - i)
+        return found
+    
+    def value(self, pos):
+        return self.slots[pos] if pos >= 0 else self.stash[-1 - pos][1]
+    
+    def insert(self, index, value):
+        """Place a slot value, displacing others as needed"""
+        fp = value >> 16
+        first = index % self.buckets
+        bucket = first
+        for bucket in (first, self._alt(first, fp)):
+            start = bucket * BUCKET_SLOTS
+            for pos in range(start, start + BUCKET_SLOTS):
+                if not self.slots[pos]:
+                    self.slots[pos] = value
+                    self.count += 1
+                    return
+        for _ in range(MAX_KICKS):
+            pos = bucket * BUCKET_SLOTS + random.randrange(BUCKET_SLOTS)
+            value, self.slots[pos] = self.slots[pos], value
+            bucket = self._alt(bucket, value >> 16)
+            start = bucket * BUCKET_SLOTS
+            for pos in range(start, start + BUCKET_SLOTS):
+                if not self.slots[pos]:
+                    self.slots[pos] = value
+                    self.count += 1
+                    return
+        self.stash.append((bucket, value))
+        self.count += 1
+
+class SkipIndex:
+    """
+    Probabilistic set of message IDs the rules decided to keep.
+    
+    A kept message can only change verdict when it crosses the age rule
+    (see FilterEngine.keep_expiry), so every entry carries the hour its
+    keep verdict expires next to its fingerprint, and stops matching
+    once that hour begins. Whitelisted messages and messages without a
+    usable date never expire. Expiry hours are also counted in a sorted
+    list, so expired entries are swept out only when enough of them
+    have piled up.
+    
+    Entries are 4 bytes in a cuckoo filter; tables are added, twice as
+    large each time, when the current one fills, so size `capacity` for
+    the mailbox to stay near 4.5 bytes per kept message. A false positive
+    (about 1 in 8000 lookups per table) means a message that was never
+    seen is skipped until the rules change.
+    
+    The index is tied to a hash of the rule set and starts over when the
+    rules change.
+    """
+    
+    def __init__(self, path='skip_index.bin', capacity=65536, events=None):
+        """
+        Args:
+            path: File the index is kept in, or None for memory only
+            capacity: Expected number of kept messages
+            events: Optional EventLog for errors; printed when unset
+        """
+        self.path = path
+        self.capacity = capacity
+        self.events = events
+        self.rules_hash = None
+        self.clock = time.time
+        self._clear()
+        self.load()
+    
+    def _clear(self):
+        self.tables = []
+        self.base_hour = int(self.clock() // HOUR)
+        # Entries per expiry code, and the codes in ascending order
+        self.expiry_counts = Counter()
+        self.expiries = []
+        self._expired = 0
+    
+    def __len__(self):
+        """Number of live entries"""
+        return sum(t.count for t in self.tables) - self._expired
+    
+    @property
+    def nbytes(self):
+        """Bytes of slot storage held in memory"""
+        return sum(len(t.slots) * t.slots.itemsize for t in self.tables)
+    
+    def invalidate(self, rules_hash):
+        """Forget everything if the rule set changed"""
+        if rules_hash != self.rules_hash:
+            self.rules_hash = rules_hash
+            self._clear()
+    
+    def _now_code(self):
+        return int(self.clock() // HOUR) - self.base_hour
+    
+    @staticmethod
+    def _hash(msg_id):
+        """(bucket index, fingerprint) for an ID"""
+        h = int.from_bytes(hashlib.blake2b(msg_id.encode('utf-8'), digest_size=8).digest(), 'little')
+        return h & 0xFFFFFFFF, (h >> 32) & 0xFFFF or 1
+    
+    def __contains__(self, msg_id):
+        index, fp = self._hash(msg_id)
+        now = self._now_code()
+        for table in self.tables:
+            for pos in table.matches(index, fp):
+                code = table.value(pos) & 0xFFFF
+                if code == PERMANENT or code > now:
+                    return True
+        return False
+    
+    def add(self, msg_id, expires_at=None):
+        """
+        Remember a kept message.
+        
+        Args:
+            msg_id: Message ID
+            expires_at: Epoch seconds when the keep verdict may change,
+                or None if it holds as long as the rules do
+        """
+        now = self._now_code()
+        if expires_at is None:
+            code = PERMANENT
+        else:
+            code = min(int(expires_at // HOUR) - self.base_hour, PERMANENT - 1)
+            if code <= now:
+                return  # due within the hour; keep evaluating it
+        
+        index, fp = self._hash(msg_id)
+        value = fp << 16 | code
+        for table in self.tables:
+            for pos in table.matches(index, fp):
+                old = table.value(pos) & 0xFFFF
+                if old == PERMANENT or old > now:
+                    return  # already indexed
+        self._count_expiry(code, 1)
+        
+        if self.tables and self.tables[-1].full:
+            self.expire()
+        if not self.tables or self.tables[-1].full:
+            if self.tables:
+                buckets = self.tables[-1].buckets * 2
+            else:
+                buckets = max(1, math.ceil(self.capacity / (BUCKET_SLOTS * MAX_LOAD)))
+            self.tables.append(_CuckooTable(buckets))
+        self.tables[-1].insert(index, value)
+    
+    def _count_expiry(self, code, delta):
+        if code == PERMANENT:
+            return
+        if not self.expiry_counts[code]:
+            bisect.insort(self.expiries, code)
+        self.expiry_counts[code] += delta
+    
+    def expire(self):
+        """
+        Account for entries whose hour has passed, and reclaim their slots
+        once they are a quarter of the index.
+        
+        Returns:
+            int: Entries swept out
+        """
+        now = self._now_code()
+        if now >= PERMANENT // 2:
+            # Expiry codes are hours since base_hour; start over before they run out
+            swept = len(self)
+            self._clear()
+            return swept
+        
+        due = bisect.bisect_right(self.expiries, now)
+        for code in self.expiries[:due]:
+            self._expired += self.expiry_counts.pop(code)
+        del self.expiries[:due]
+        
+        total = sum(t.count for t in self.tables)
+        if not self._expired or self._expired * 4 < total:
+            return 0
+        
+        swept = 0
+        for table in self.tables:
+            slots = table.slots
+            for pos in range(len(slots)):
+                value = slots[pos]
+                if value and (value & 0xFFFF) <= now:
+                    slots[pos] = 0
+                    swept += 1
+            live = [(b, v) for b, v in table.stash if (v & 0xFFFF) > now]
+            swept += len(table.stash) - len(live)
+            table.stash = live
+            table.count = sum(1 for v in slots if v) + len(live)
+        self.tables = [t for t in self.tables if t.count or t is self.tables[-1]]
+        self._expired = 0
+        return swept
+    
+    def load(self):
+        """Read the index and the hash of the rules it was built under"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                header = json.loads(f.readline())
+                data = f.read()
+            tables = []
+            offset = 0
+            for buckets, count, stash in header['tables']:
+                table = _CuckooTable(buckets)
+                size = len(table.slots) * table.slots.itemsize
+                table.slots = array('I', data[offset:offset + size])
+                if header['byteorder'] != sys.byteorder:
+                    table.slots.byteswap()
+                table.count = count
+                table.stash = [tuple(entry) for entry in stash]
+                offset += size
+                tables.append(table)
+        except Exception as e:
+            report_error(self.events, f"Error loading skip index {self.path}: {e}")
+            return
+        self.rules_hash = header.get('rules_hash')
+        self.base_hour = header['base_hour']
+        self.tables = tables
+        self.expiry_counts = Counter({code: count for code, count in header['expiries']})
+        self.expiries = sorted(self.expiry_counts)
+        self._expired = header['expired']
+    
+    def save(self):
+        """Write the index atomically, so a crash never leaves half a file"""
+        if not self.path:
+            return
+        header = {
+            'rules_hash': self.rules_hash,
+            'base_hour': self.base_hour,
+            'byteorder': sys.byteorder,
+            'tables': [[t.buckets, t.count, t.stash] for t in self.tables],
+            'expiries': [[code, self.expiry_counts[code]] for code in self.expiries],
+            'expired': self._expired
+        }
+        data = json.dumps(header).encode('utf-8') + b'\n'
+        data += b''.join(table.slots.tobytes() for table in self.tables)
+        try:
+            write_atomic(self.path, data)
+        except Exception as e:
+            report_error(self.events, f"Error saving skip index {self.path}: {e}")
@@ -0,0 +1,47 @@
+"""Small helpers shared across modules"""
+
+import os
+import sys
+
+def current_rss_mb():
+    """
+    Resident set size of this process in MB, or None if unknown.
+    
+    Reads /proc on Linux (the live value); elsewhere falls back to the
+    peak reported by getrusage.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS, kilobytes elsewhere
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except (ImportError, OSError):
+        return None
+
+def write_atomic(path, data, mode=0o644):
+    """
+    Write a file via a temporary file and rename, so readers never see half of it.
+    
+    Args:
+        path: File to replace
+        data: Text (written as UTF-8) or bytes
+        mode: Permission bits for a newly created file
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,334 @@
+"""In-memory stand-in for the Gmail API service used by the tests"""
+
+import json
+import re
+from email.utils import format_datetime
+from datetime import datetime, timezone
+
+from src.filters import FilterEngine
+from src.gmail_client import GmailClient
+from src.scheduler import SanitizerScheduler
+
+# Fixed clock for test inboxes
+NOW = 1700000000
+DAY = 86400
+
+def _split_top(spec):
+    """Split a fields spec on commas that are not inside parentheses"""
+    parts, depth, start = [], 0, 0
+    for i, char in enumerate(spec):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            parts.append(spec[start:i])
+            start = i + 1
+    parts.append(spec[start:])
+    return [p.strip() for p in parts if p.strip()]
+
+def parse_fields(spec):
+    """
+    Parse a partial-response mask into a tree of wanted keys.
+    
+    'a,b/c,d(e,f)' -> {'a': None, 'b': {'c': None}, 'd': {'e': None, 'f': None}}
+    where None means "the whole value".
+    """
+    tree = {}
+    for part in _split_top(spec):
+        path, _, sub = part.partition('(')
+        keys = path.split('/')
+        node = tree
+        for key in keys[:-1]:
+            if key in node and node[key] is None:
+                break  # already selected whole
+            node = node.setdefault(key, {})
+        else:
+            node[keys[-1]] = parse_fields(sub[:-1]) if sub else None
+    return tree
+
+def project(value, tree):
+    """Keep only the parts of a response selected by a parsed mask"""
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        return [project(item, tree) for item in value]
+    if isinstance(value, dict):
+        return {key: project(value[key], sub) for key, sub in tree.items() if key in value}
+    return value
+
+class _Request:
+    """
+    Mimics googleapiclient's HttpRequest: work happens on execute().
+    
+    Responses go through a JSON round trip, honouring any `fields` mask,
+    and the encoded size is added to the service's `bytes_returned`.
+    """
+    
+    def __init__(self, service, func, fields=None):
+        self.service = service
+        self.func = func
+        self.fields = fields
+    
+    def execute(self):
+        result = self.func()
+        if self.fields:
+            result = project(result, parse_fields(self.fields))
+        body = json.dumps(result)
+        self.service.bytes_returned += len(body)
+        return json.loads(body)
+
+class _Threads:
+    """`service.users().threads()`, sharing the parent's message store"""
+    
+    def __init__(self, service):
+        self.service = service
+    
+    def modify(self, userId, id, body, fields=None):
+        self.service.calls.append(('threads.modify', {'id': id, 'body': body}))
+        
+        def run():
+            for msg in self.service.store.values():
+                if msg['threadId'] == id:
+                    for label in body.get('removeLabelIds', []):
+                        if label in msg['labelIds']:
+                            msg['labelIds'].remove(label)
+            return {'id': id}
+        return _Request(self.service, run, fields)
+
+class FakeGmailService:
+    """
+    Enough of `service.users().messages()` and `.threads()` to drive
+    GmailClient.
+    
+    Messages are stored in `store` as full API resources. `calls` records
+    every request as (method, kwargs) so tests can count API traffic.
+    """
+    
+    def __init__(self, messages=()):
+        self.store = {}
+        self.calls = []
+        self.bytes_returned = 0
+        for msg in messages:
+            self.add(**msg)
+    
+    def add(self, id, sender='someone@example.com', subject='hello', snippet='',
+            timestamp=1700000000, thread_id=None, labels=('INBOX',)):
+        """Add a message; timestamp is epoch seconds"""
+        date = format_datetime(datetime.fromtimestamp(timestamp, timezone.utc))
+        self.store[id] = {
+            'id': id,
+            'threadId': thread_id or id,
+            'labelIds': list(labels),
+            'snippet': snippet,
+            'historyId': '12345',
+            'internalDate': str(timestamp * 1000),
+            'sizeEstimate': 2048,
+            'payload': {
+                'partId': '',
+                'mimeType': 'text/plain',
+                'filename': '',
+                'headers': [
+                    {'name': 'From', 'value': sender},
+                    {'name': 'Subject', 'value': subject},
+                    {'name': 'Date', 'value': date},
+                ],
+                'body': {'size': 0},
+            },
+        }
+    
+    # Resource accessors, as in googleapiclient
+    
+    def users(self):
+        return self
+    
+    def messages(self):
+        return self
+    
+    def threads(self):
+        return _Threads(self)
+    
+    # messages() methods
+    
+    def list(self, userId, q='', maxResults=100, pageToken=None, fields=None):
+        self.calls.append(('list', {'q': q, 'maxResults': maxResults, 'pageToken': pageToken}))
+        
+        def run():
+            matched = [m for m in self._sorted() if self._matches(m, q)]
+            start = int(pageToken or 0)
+            page = matched[start:start + maxResults]
+            result = {
+                'messages': [{'id': m['id'], 'threadId': m['threadId']} for m in page],
+                'resultSizeEstimate': len(matched),
+            }
+            if start + maxResults < len(matched):
+                result['nextPageToken'] = str(start + maxResults)
+            if not page:
+                del result['messages']
+            return result
+        return _Request(self, run, fields)
+    
+    def get(self, userId, id, format='full', metadataHeaders=None, fields=None):
+        self.calls.append(('get', {'id': id, 'format': format}))
+        return _Request(self, lambda: self.store[id], fields)
+    
+    def modify(self, userId, id, body, fields=None):
+        self.calls.append(('modify', {'id': id, 'body': body}))
+        
+        def run():
+            msg = self.store[id]
+            for label in body.get('removeLabelIds', []):
+                if label in msg['labelIds']:
+                    msg['labelIds'].remove(label)
+            return {'id': id, 'threadId': msg['threadId'], 'labelIds': msg['labelIds']}
+        return _Request(self, run, fields)
+    
+    def delete(self, userId, id):
+        self.calls.append(('delete', {'id': id}))
+        return _Request(self, lambda: self.store.pop(id) and '')
+    
+    # Helpers
+    
+    def count(self, method):
+        """Number of recorded calls to one method"""
+        return sum(1 for name, _ in self.calls if name == method)
+    
+    def _sorted(self):
+        """Newest first, like Gmail"""
+        return sorted(self.store.values(), key=lambda m: -int(m['internalDate']))
+    
+    def _matches(self, msg, query):
+        seconds = int(msg['internalDate']) // 1000
+        senders = re.search(r'from:\(([^)]*)\)', query)
+        if senders:
+            query = query.replace(senders.group(0), '')
+            wanted = [a.lower() for a in senders.group(1).split() if a != 'OR']
+            sender = msg['payload']['headers'][0]['value'].lower()
+            if not any(addr in sender for addr in wanted):
+                return False
+        for term in query.split():
+            key, _, value = term.partition(':')
+            if key == 'in' and value.upper() not in msg['labelIds']:
+                return False
+            if key == 'after' and not seconds > int(value):
+                return False
+            if key == 'before' and not seconds < int(value):
+                return False
+        return True
+
+class FakeGmailServer:
+    """
+    Local HTTP server speaking the Gmail REST endpoints the client uses.
+    
+    Requests are answered from a FakeGmailService, so tests can inspect
+    `service.calls` and `service.store` afterwards. Use as a context
+    manager; `url` is the base URL to hand to AsyncGmailClient.
+    """
+    
+    def __init__(self, service):
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from urllib.parse import parse_qs, urlparse
+        
+        fake = service
+        prefix = '/gmail/v1/users/me/'
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+            
+            def log_message(self, *args):
+                pass
+            
+            def _send(self, status, payload=None):
+                body = b'' if payload is None else json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def _route(self, method):
+                if not self.headers.get('Authorization', '').startswith('Bearer '):
+                    return self._send(401, {'error': 'unauthenticated'})
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                one = lambda key, default=None: query.get(key, [default])[0]
+                parts = url.path[len(prefix):].split('/')
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length)) if length else {}
+                
+                try:
+                    if method == 'GET' and parts == ['messages']:
+                        request = fake.list(userId='me', q=one('q', ''),
+                                            maxResults=int(one('maxResults', 100)),
+                                            pageToken=one('pageToken'), fields=one('fields'))
+                    elif method == 'GET' and parts[0] == 'messages' and len(parts) == 2:
+                        request = fake.get(userId='me', id=parts[1], format=one('format', 'full'),
+                                           metadataHeaders=query.get('metadataHeaders'),
+                                           fields=one('fields'))
+                    elif method == 'POST' and parts[0] == 'messages' and parts[2:] == ['modify']:
+                        request = fake.modify(userId='me', id=parts[1], body=body, fields=one('fields'))
+                    elif method == 'POST' and parts[0] == 'threads' and parts[2:] == ['modify']:
+                        request = fake.threads().modify(userId='me', id=parts[1], body=body,
+                                                        fields=one('fields'))
+                    elif method == 'DELETE' and parts[0] == 'messages' and len(parts) == 2:
+                        fake.delete(userId='me', id=parts[1]).execute()
+                        return self._send(204)
+                    else:
+                        return self._send(404, {'error': 'not found'})
+                    return self._send(200, request.execute())
+                except KeyError:
+                    return self._send(404, {'error': 'not found'})
+            
+            def do_GET(self):
+                self._route('GET')
+            
+            def do_POST(self):
+                self._route('POST')
+            
+            def do_DELETE(self):
+                self._route('DELETE')
+        
+        self.service = service
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+    
+    def __enter__(self):
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+def make_inbox(count, spam_every=3, spacing=1):
+    """
+    FakeGmailService holding m0 .. m{count-1}, newest first and `spacing`
+    seconds apart; every `spam_every`th message is from ads@spam.com.
+    """
+    service = FakeGmailService()
+    for i in range(count):
+        sender = 'ads@spam.com' if i % spam_every == 0 else 'friend@example.com'
+        service.add(f"m{i}", sender=sender, subject=f"subject {i}", timestamp=NOW - i * spacing)
+    return service
+
+def make_filters(**config):
+    """FilterEngine that archives @spam.com and never ages mail out, plus overrides"""
+    filters = FilterEngine(config_file=None)
+    filters.config['blacklist'] = ['@spam.com']
+    filters.config['max_age_days'] = 100000
+    filters.config.update(config)
+    return filters
+
+def make_scheduler(service, filters=None, events=None, budget=None):
+    """SanitizerScheduler over a GmailClient for `service`"""
+    gmail = GmailClient(service)
+    scheduler = SanitizerScheduler(gmail, filters or make_filters())
+    scheduler.budget = budget
+    if events is not None:
+        gmail.events = events
+        scheduler.events = events
+    return scheduler
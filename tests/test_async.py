@@ -0,0 +1,95 @@
+"""Tests for AsyncGmailClient and AsyncSanitizerScheduler against a local HTTP server"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import pytest
+
+pytest.importorskip('httpx')
+
+from src.async_gmail_client import AsyncGmailClient
+from src.reputation import SenderReputation
+from src.scheduler import AsyncSanitizerScheduler
+from tests.fake_gmail import FakeGmailServer, make_filters, make_inbox
+
+class StaticCredentials:
+    """Credentials that never expire"""
+    valid = True
+    token = 'test-token'
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_client_lists_and_fetches_over_http():
+    """Coroutines should return the same shapes as GmailClient"""
+    service = make_inbox(5)
+    
+    async def scenario(url):
+        async with AsyncGmailClient(StaticCredentials(), base_url=url) as client:
+            listed = await client.list_messages('in:inbox', max_results=10)
+            msg = await client.get_message(listed[0]['id'])
+            missing = await client.get_message('nope')
+            return listed, msg, missing
+    
+    with FakeGmailServer(service) as server:
+        listed, msg, missing = run(scenario(server.url))
+    
+    assert len(listed) == 5
+    assert listed[0] == {'id': 'm0', 'threadId': 'm0'}
+    assert msg['from'] == 'ads@spam.com' and msg['subject'] == 'subject 0'
+    assert missing is None
+
+def test_client_archives_messages_and_threads():
+    """modify calls should reach the server with the INBOX removal"""
+    service = make_inbox(2)
+    
+    async def scenario(url):
+        async with AsyncGmailClient(StaticCredentials(), base_url=url) as client:
+            return await client.archive_message('m0'), await client.archive_thread('m1')
+    
+    with FakeGmailServer(service) as server:
+        assert run(scenario(server.url)) == (True, True)
+    
+    assert service.store['m0']['labelIds'] == []
+    assert service.store['m1']['labelIds'] == []
+
+def test_async_scheduler_runs_many_fetches_concurrently():
+    """A whole batch should be fetched and filtered on one event loop"""
+    service = make_inbox(120)
+    filters = make_filters()
+    
+    async def scenario(url):
+        async with AsyncGmailClient(StaticCredentials(), base_url=url, max_connections=20) as client:
+            scheduler = AsyncSanitizerScheduler(client, filters, concurrency=50)
+            return await scheduler.run_once(max_messages=1000)
+    
+    with FakeGmailServer(service) as server:
+        results = run(scenario(server.url))
+    
+    assert results['processed'] == 120
+    assert results['archived'] == 40
+    assert service.count('get') == 120
+    assert service.count('modify') == 40
+
+def test_async_scheduler_archives_known_senders_without_fetch():
+    """Confident archive senders are listed with from: and never fetched"""
+    service = make_inbox(30)
+    filters = make_filters()
+    filters.use_reputation(SenderReputation(None, min_messages=3))
+    for _ in range(3):
+        filters.should_archive({'from': 'ads@spam.com', 'subject': '', 'snippet': ''})
+    
+    async def scenario(url):
+        async with AsyncGmailClient(StaticCredentials(), base_url=url) as client:
+            scheduler = AsyncSanitizerScheduler(client, filters)
+            return await scheduler.run_once(max_messages=100)
+    
+    with FakeGmailServer(service) as server:
+        results = run(scenario(server.url))
+    
+    assert results['processed'] == 30
+    assert results['archived'] == 10
+    assert service.count('get') == 20
+    assert service.count('modify') == 10
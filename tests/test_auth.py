@@ -1,16 +1,23 @@
 """Comprehensive tests for authentication module"""
 
 import pytest
-from unittest.mock import Mock, patch, MagicMock, mock_open
+from unittest.mock import Mock, patch, MagicMock
 from src.auth import (
     get_service, 
     test_connection, 
     _get_gmail_service, 
+    _discovery_cache_path,
+    _discovery_document,
     revoke_credentials,
     TOKEN_FILE,
     CREDENTIALS_FILE
 )
-import pickle
+
+@pytest.fixture(autouse=True)
+def no_discovery_cache():
+    """Build services through the patched build() rather than the on-disk cache"""
+    with patch('src.auth._discovery_document', return_value=None):
+        yield
 
 class TestGetService:
     """Tests for get_service() function"""
@@ -51,17 +58,19 @@ class TestGmailService:
         """Should load and use existing valid credentials"""
         mock_creds = MagicMock()
         mock_creds.valid = True
+        mock_creds.expiry = None
         
-        with patch('src.auth.os.path.exists', return_value=True):
-            with patch('builtins.open', mock_open(read_data=b'pickled_data')):
-                with patch('pickle.load', return_value=mock_creds):
-                    with patch('src.auth.build') as mock_build:
-                        mock_build.return_value = Mock()
-                        
-                        service = _get_gmail_service()
-                        
-                        assert service is not None
-                        mock_build.assert_called_once_with('gmail', 'v1', credentials=mock_creds)
+        with patch('src.auth.load_token', return_value=mock_creds):
+            with patch('src.auth.save_token') as mock_save:
+                with patch('src.auth.build') as mock_build:
+                    mock_build.return_value = Mock()
+                    
+                    service = _get_gmail_service()
+                    
+                    assert service is not None
+                    mock_build.assert_called_once_with('gmail', 'v1', credentials=mock_creds)
+                    mock_creds.refresh.assert_not_called()
+                    mock_save.assert_not_called()
     
     def test_refreshes_expired_token_with_refresh_token(self):
         """Should refresh expired token if refresh_token exists"""
@@ -70,17 +79,16 @@ class TestGmailService:
         mock_creds.expired = True
         mock_creds.refresh_token = 'refresh_token_123'
         
-        with patch('src.auth.os.path.exists', return_value=True):
-            with patch('builtins.open', mock_open()):
-                with patch('pickle.load', return_value=mock_creds):
-                    with patch('pickle.dump'):
-                        with patch('src.auth.build') as mock_build:
-                            mock_build.return_value = Mock()
-                            
-                            service = _get_gmail_service()
-                            
-                            mock_creds.refresh.assert_called_once()
-                            assert service is not None
+        with patch('src.auth.load_token', return_value=mock_creds):
+            with patch('src.auth.save_token') as mock_save:
+                with patch('src.auth.build') as mock_build:
+                    mock_build.return_value = Mock()
+                    
+                    service = _get_gmail_service()
+                    
+                    mock_creds.refresh.assert_called_once()
+                    mock_save.assert_called_once_with(mock_creds)
+                    assert service is not None
     
     def test_refresh_failure_starts_new_oauth_flow(self):
         """Should start new OAuth flow if token refresh fails"""
@@ -94,21 +102,20 @@ class TestGmailService:
         mock_new_creds.valid = True
         
         with patch('src.auth.os.path.exists', return_value=True):
-            with patch('builtins.open', mock_open()):
-                with patch('pickle.load', return_value=mock_creds):
-                    with patch('pickle.dump'):
-                        with patch('src.auth.InstalledAppFlow.from_client_secrets_file') as mock_flow:
-                            mock_flow_instance = Mock()
-                            mock_flow_instance.run_local_server.return_value = mock_new_creds
-                            mock_flow.return_value = mock_flow_instance
+            with patch('src.auth.load_token', return_value=mock_creds):
+                with patch('src.auth.save_token'):
+                    with patch('src.auth.InstalledAppFlow.from_client_secrets_file') as mock_flow:
+                        mock_flow_instance = Mock()
+                        mock_flow_instance.run_local_server.return_value = mock_new_creds
+                        mock_flow.return_value = mock_flow_instance
+                        
+                        with patch('src.auth.build') as mock_build:
+                            mock_build.return_value = Mock()
+                            
+                            service = _get_gmail_service()
                             
-                            with patch('src.auth.build') as mock_build:
-                                mock_build.return_value = Mock()
-                                
-                                service = _get_gmail_service()
-                                
-                                mock_flow_instance.run_local_server.assert_called_once()
-                                assert service is not None
+                            mock_flow_instance.run_local_server.assert_called_once()
+                            assert service is not None
     
     def test_missing_credentials_file_raises_error(self):
         """Should raise FileNotFoundError if credentials.json missing"""
@@ -133,15 +140,14 @@ class TestGmailService:
                 mock_flow_instance.run_local_server.return_value = mock_creds
                 mock_flow.return_value = mock_flow_instance
                 
-                with patch('builtins.open', mock_open()):
-                    with patch('pickle.dump'):
-                        with patch('src.auth.build') as mock_build:
-                            mock_build.return_value = Mock()
-                            
-                            service = _get_gmail_service()
-                            
-                            mock_flow_instance.run_local_server.assert_called_once_with(port=0)
-                            assert service is not None
+                with patch('src.auth.save_token'):
+                    with patch('src.auth.build') as mock_build:
+                        mock_build.return_value = Mock()
+                        
+                        service = _get_gmail_service()
+                        
+                        mock_flow_instance.run_local_server.assert_called_once_with(port=0)
+                        assert service is not None
     
     def test_oauth_flow_failure_returns_none(self):
         """Should return None if OAuth flow fails"""
@@ -156,7 +162,7 @@ class TestGmailService:
                 assert service is None
     
     def test_saves_credentials_after_auth(self):
-        """Should save credentials to token.pickle after successful auth"""
+        """Should save credentials to the token file after successful auth"""
         mock_creds = MagicMock()
         mock_creds.valid = True
         
@@ -168,16 +174,14 @@ class TestGmailService:
                 mock_flow_instance.run_local_server.return_value = mock_creds
                 mock_flow.return_value = mock_flow_instance
                 
-                m_open = mock_open()
-                with patch('builtins.open', m_open):
-                    with patch('pickle.dump') as mock_dump:
-                        with patch('src.auth.build', return_value=Mock()):
-                            service = _get_gmail_service()
-                            
-                            # Verify pickle.dump was called with credentials
-                            mock_dump.assert_called_once()
-                            call_args = mock_dump.call_args[0]
-                            assert call_args[0] == mock_creds
+                with patch('src.auth.save_token') as mock_save:
+                    with patch('src.auth.build', return_value=Mock()):
+                        service = _get_gmail_service()
+                        
+                        # Verify save_token was called with credentials
+                        mock_save.assert_called_once()
+                        call_args = mock_save.call_args[0]
+                        assert call_args[0] == mock_creds
 
 class TestConnectionTesting:
     """Tests for test_connection() function"""
@@ -226,8 +230,8 @@ class TestCredentialRevocation:
     """Tests for revoke_credentials() function"""
     
     def test_revoke_removes_token_file(self):
-        """Should remove token.pickle file"""
-        with patch('src.auth.os.path.exists', return_value=True):
+        """Should remove the token file"""
+        with patch('src.auth.os.path.exists', side_effect=lambda path: path == TOKEN_FILE):
             with patch('src.auth.os.remove') as mock_remove:
                 result = revoke_credentials()
                 
@@ -256,15 +260,14 @@ class TestIntegration:
         """Test complete flow with valid token"""
         mock_creds = MagicMock()
         mock_creds.valid = True
+        mock_creds.expiry = None
         mock_service = Mock()
         
-        with patch('src.auth.os.path.exists', return_value=True):
-            with patch('builtins.open', mock_open()):
-                with patch('pickle.load', return_value=mock_creds):
-                    with patch('src.auth.build', return_value=mock_service):
-                        service = get_service('gmail')
-                        
-                        assert service == mock_service
+        with patch('src.auth.load_token', return_value=mock_creds):
+            with patch('src.auth.build', return_value=mock_service):
+                service = get_service('gmail')
+                
+                assert service == mock_service
     
     def test_full_flow_with_token_refresh(self):
         """Test complete flow with token refresh"""
@@ -274,12 +277,109 @@ class TestIntegration:
         mock_creds.refresh_token = 'refresh'
         mock_service = Mock()
         
-        with patch('src.auth.os.path.exists', return_value=True):
-            with patch('builtins.open', mock_open()):
-                with patch('pickle.load', return_value=mock_creds):
-                    with patch('pickle.dump'):
-                        with patch('src.auth.build', return_value=mock_service):
-                            service = get_service('gmail')
-                            
-                            mock_creds.refresh.assert_called_once()
-                            assert service == mock_service
+        with patch('src.auth.load_token', return_value=mock_creds):
+            with patch('src.auth.save_token'):
+                with patch('src.auth.build', return_value=mock_service):
+                    service = get_service('gmail')
+                    
+                    mock_creds.refresh.assert_called_once()
+                    assert service == mock_service
+
+class TestTokenStore:
+    """Tests for the JSON token file, pickle migration and discovery cache"""
+    
+    @staticmethod
+    def make_creds(expires_in):
+        from datetime import datetime, timedelta, timezone
+        from google.oauth2.credentials import Credentials
+        return Credentials(
+            token='access', refresh_token='refresh', client_id='id', client_secret='secret',
+            token_uri='https://oauth2.googleapis.com/token',
+            expiry=datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(seconds=expires_in)
+        )
+    
+    def test_save_and_load_round_trip(self, tmp_path):
+        """Tokens should be stored as owner-only JSON and read back"""
+        import json
+        import os
+        from src.auth import load_token, save_token
+        path = str(tmp_path / 'token.json')
+        
+        assert save_token(self.make_creds(3600), path)
+        
+        assert json.load(open(path))['refresh_token'] == 'refresh'
+        assert os.stat(path).st_mode & 0o777 == 0o600
+        creds = load_token(path)
+        assert creds.token == 'access'
+        assert creds.valid
+    
+    def test_migrates_pickle_token(self, tmp_path, monkeypatch):
+        """A token.pickle should be converted to JSON and removed"""
+        import os
+        import pickle
+        from src.auth import load_token
+        monkeypatch.chdir(tmp_path)
+        with open('token.pickle', 'wb') as f:
+            pickle.dump(self.make_creds(3600), f)
+        
+        creds = load_token('token.json')
+        
+        assert creds.refresh_token == 'refresh'
+        assert not os.path.exists('token.pickle')
+        assert load_token('token.json').refresh_token == 'refresh'
+    
+    def test_refreshes_only_near_expiry(self):
+        """Tokens with time left are used as is; nearly expired ones are refreshed"""
+        from src.auth import _needs_refresh
+        
+        assert not _needs_refresh(self.make_creds(3600))
+        assert _needs_refresh(self.make_creds(60))
+    
+    def test_discovery_document_is_trimmed_and_cached(self, tmp_path):
+        """The cached document should keep only the resources the client calls"""
+        import json
+        from googleapiclient.discovery import build_from_document
+        
+        with patch('src.auth.DISCOVERY_CACHE_DIR', str(tmp_path)):
+            document = _discovery_document('gmail', 'v1')
+            path = _discovery_cache_path('gmail', 'v1')
+            
+            assert open(path).read() == document
+            with open(path, 'w') as f:
+                f.write('{"cached": true}')
+            assert _discovery_document('gmail', 'v1') == '{"cached": true}'
+        
+        resources = json.loads(document)['resources']['users']['resources']
+        assert sorted(resources) == ['messages', 'threads']
+        service = build_from_document(document, credentials=self.make_creds(3600))
+        assert service.users().messages().list(userId='me').uri
+    
+    def test_discovery_cache_is_keyed_by_library_version(self, tmp_path):
+        """Upgrading google-api-python-client should not reuse an old document"""
+        from googleapiclient.version import __version__
+        
+        with patch('src.auth.DISCOVERY_CACHE_DIR', str(tmp_path)):
+            path = _discovery_cache_path('gmail', 'v1')
+        
+        assert path == str(tmp_path / f"gmail.v1.{__version__}.json")
+    
+    def test_unusable_cached_document_falls_back_to_build(self, tmp_path):
+        """A cached document that cannot be built from is deleted, not fatal"""
+        import os
+        mock_creds = MagicMock()
+        mock_creds.valid = True
+        mock_creds.expiry = None
+        
+        with patch('src.auth.DISCOVERY_CACHE_DIR', str(tmp_path)):
+            path = _discovery_cache_path('gmail', 'v1')
+            with open(path, 'w') as f:
+                f.write('{"broken": true}')
+            with patch('src.auth._discovery_document', return_value='{"broken": true}'), \
+                    patch('src.auth.load_token', return_value=mock_creds), \
+                    patch('src.auth.build_from_document', side_effect=KeyError('rootUrl')), \
+                    patch('src.auth.build') as mock_build:
+                service = _get_gmail_service()
+        
+        assert service is mock_build.return_value
+        mock_build.assert_called_once_with('gmail', 'v1', credentials=mock_creds)
+        assert not os.path.exists(path)
@@ -0,0 +1,126 @@
+"""Tests for per-run budgets"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.budget import RunBudget
+from src.reputation import SenderReputation
+from tests.fake_gmail import NOW, make_inbox, make_scheduler
+
+def test_client_counts_quota_units():
+    """Each call should add its Gmail quota cost"""
+    service = make_inbox(4, spam_every=2)
+    scheduler = make_scheduler(service)
+    
+    scheduler.run_once(max_messages=100)
+    
+    # 1 list + 4 gets + 2 modifies, 5 units each
+    assert scheduler.gmail.quota_used == 35
+
+def test_quota_budget_stops_and_resumes():
+    """A run that hits its quota should leave the rest for the next run"""
+    service = make_inbox(10, spam_every=2)
+    scheduler = make_scheduler(service, budget=RunBudget(max_units=30))
+    
+    first = scheduler.run_once(max_messages=100)
+    
+    # list (5) + 5 gets (25) reaches 30 units
+    assert first['stopped'] == 'quota limit of 30 units'
+    assert first['processed'] == 5
+    assert first['pending'] == 5
+    assert first['archived'] == 3
+    assert service.count('modify') == 3
+    
+    scheduler.budget = None
+    second = scheduler.run_once(max_messages=100)
+    
+    assert second['processed'] == 5
+    assert second['pending'] == 0
+    # The resumed run only lists mail newer than what the first one fetched
+    assert service.count('list') == 2
+    assert sorted(c[1]['id'] for c in service.calls if c[0] == 'get') == sorted(service.store)
+
+def test_one_shot_run_does_not_promise_a_next_run(capsys):
+    """Only the daemon keeps the backlog, so only it says the rest is left for later"""
+    make_scheduler(make_inbox(10), budget=RunBudget(max_units=30)).run_once(max_messages=100)
+    one_shot = capsys.readouterr().out
+    scheduler = make_scheduler(make_inbox(10), budget=RunBudget(max_units=30))
+    scheduler._start_daemon(60, None)
+    scheduler.run_once(max_messages=100)
+    daemon = capsys.readouterr().out
+    
+    assert '5 listed messages were not checked. Run again to check them.' in one_shot
+    assert 'left for the next run' not in one_shot
+    assert 'messages left for the next run' in daemon
+
+def test_resumed_run_sees_new_mail_first():
+    """Mail arriving while a backlog drains should be fetched and counted as new"""
+    service = make_inbox(10, spam_every=2)
+    scheduler = make_scheduler(service, budget=RunBudget(max_units=30))
+    scheduler.run_once(max_messages=100)
+    service.add('fresh', sender='friend@example.com', timestamp=NOW + 100)
+    
+    scheduler.budget = None
+    results = scheduler.run_once(max_messages=3)
+    
+    assert results['new'] == 1
+    assert results['processed'] == 3
+    assert results['pending'] == 3
+    assert [c[1]['id'] for c in service.calls if c[0] == 'get'][-3:] == ['fresh', 'm5', 'm6']
+
+def test_partition_planning_respects_budget():
+    """No estimates should be spent once the budget is exhausted"""
+    service = make_inbox(50, spam_every=2)
+    scheduler = make_scheduler(service, budget=RunBudget(max_units=0))
+    
+    results = scheduler.run_once(max_messages=100, workers=4)
+    
+    assert results['stopped'] == 'quota limit of 0 units'
+    assert service.count('get') == 0
+    assert service.count('list') == 1
+
+def test_time_budget():
+    """An exhausted clock should stop the run before fetching"""
+    budget = RunBudget(max_seconds=10)
+    now = [0]
+    budget.clock = lambda: now[0]
+    scheduler = make_scheduler(make_inbox(3), budget=budget)
+    budget.start(scheduler.gmail)
+    
+    assert budget.exhausted() is None
+    now[0] = 10
+    assert budget.exhausted() == 'time limit of 10s'
+
+def test_memory_budget():
+    """A limit below current RSS should be reported as exhausted"""
+    budget = RunBudget(max_rss_mb=1)
+    budget.start(None)
+    
+    assert budget.exhausted() == 'memory limit of 1 MB'
+
+def test_known_sender_archiving_respects_budget():
+    """The from: fast path should stop archiving once the quota is spent"""
+    service = make_inbox(20, spam_every=2)
+    scheduler = make_scheduler(service, budget=RunBudget(max_units=20))
+    scheduler.filters.use_reputation(SenderReputation(None, min_messages=3))
+    for _ in range(3):
+        scheduler.filters.should_archive({'from': 'ads@spam.com', 'subject': '', 'snippet': ''})
+    
+    results = scheduler.run_once(max_messages=100)
+    
+    # from: list (5) + 3 modifies (15) reaches 20 units
+    assert service.count('modify') == 3
+    assert service.count('get') == 0
+    assert results['stopped'] == 'quota limit of 20 units'
+
+def test_small_partitioned_run_spends_budget_on_messages():
+    """A one-page inbox should not burn the quota on partition estimates"""
+    service = make_inbox(60, spam_every=2)
+    scheduler = make_scheduler(service, budget=RunBudget(max_units=100))
+    
+    results = scheduler.run_once(max_messages=100, workers=4)
+    
+    # estimate (5) + list (5) leave 90 units for gets
+    assert results['processed'] == 18
+    assert service.count('list') == 2
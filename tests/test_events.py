@@ -0,0 +1,106 @@
+"""Tests for the structured event log"""
+
+import io
+import json
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.events import EventLog, EventSummary
+from src.local_source import LocalMailClient
+from tests.fake_gmail import make_inbox, make_scheduler
+
+def read_events(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+def test_run_writes_json_events():
+    """Each message should get one event with its verdict, rule and timings"""
+    output = io.StringIO()
+    events = EventLog(output)
+    scheduler = make_scheduler(make_inbox(6), events=events)
+    
+    scheduler.run_once(max_messages=100)
+    events.close()
+    
+    written = read_events(output)
+    messages = [e for e in written if e['event'] == 'message']
+    assert len(messages) == 6
+    archived = sorted(e['id'] for e in messages if e['verdict'] == 'archive')
+    assert archived == ['m0', 'm3']
+    assert all(e['rule'] and e['fetch_ms'] is not None for e in messages)
+    
+    actions = [e for e in written if e['event'] == 'action']
+    assert sorted(e['id'] for e in actions) == ['m0', 'm3']
+    assert all(e['ok'] for e in actions)
+    assert written[0]['event'] == 'run_start'
+    assert written[-1]['event'] == 'run_end'
+    assert written[-1]['archived'] == 2
+
+def test_summary_from_events(tmp_path):
+    """The human report should be computed from the written log"""
+    path = tmp_path / 'events.jsonl'
+    events = EventLog(open(path, 'w', encoding='utf-8'), owns_output=True)
+    scheduler = make_scheduler(make_inbox(6), events=events)
+    
+    scheduler.run_once(max_messages=100, dry_run=True)
+    events.close()
+    
+    summary = EventSummary.from_file(str(path))
+    assert summary.verdicts == events.summary.verdicts
+    assert summary.verdicts['archive'] == 2
+    assert not summary.actions
+    report = summary.format()
+    assert 'Checked 6 messages: 2 archive, 4 keep' in report
+    assert 'subject 0' in report
+
+def test_check_report_lists_every_archive():
+    """With examples=None the report names every message, with no "more" line"""
+    capped = EventLog()
+    make_scheduler(make_inbox(90), events=capped).run_once(max_messages=100, dry_run=True)
+    events = EventLog(examples=None)
+    make_scheduler(make_inbox(90), events=events).run_once(max_messages=100, dry_run=True)
+    
+    report = events.summary.format()
+    
+    assert capped.summary.format().count('  -> ') == 20
+    assert report.count('  -> ') == 30
+    assert 'more' not in report
+
+def test_errors_become_events():
+    """Client errors should be logged as events, not printed"""
+    output = io.StringIO()
+    events = EventLog(output)
+    scheduler = make_scheduler(make_inbox(6), events=events)
+    
+    assert scheduler.gmail.get_message('missing') is None
+    events.flush()
+    
+    written = read_events(output)
+    assert written[0]['event'] == 'error'
+    assert written[0]['id'] == 'missing'
+    assert events.summary.error_count == 1
+    events.close()
+
+def test_read_only_source_errors_stay_off_stdout(tmp_path, capsys):
+    """Refused archives on a local source should be events, not prints"""
+    path = tmp_path / 'Inbox.mbox'
+    path.write_bytes(b"From x\nFrom: a@spam.com\nSubject: hi\n\nBody\n")
+    output = io.StringIO()
+    events = EventLog(output)
+    client = LocalMailClient(str(path))
+    client.events = events
+    
+    assert client.archive_message('0') is False
+    events.close()
+    
+    assert read_events(output)[0]['event'] == 'error'
+    assert capsys.readouterr().out == ''
+
+def test_no_output_keeps_summary(capsys):
+    """The default log writes nothing but still summarizes"""
+    scheduler = make_scheduler(make_inbox(6), events=EventLog())
+    
+    scheduler.run_once(max_messages=100)
+    
+    assert scheduler.events.summary.verdicts['archive'] == 2
+    assert 'm0' not in capsys.readouterr().out
@@ -2,6 +2,7 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import pytest
 from src.filters import FilterEngine
 
 def test_whitelist_keeps_messages():
@@ -52,3 +53,73 @@ def test_stats_tracking():
     assert filters.stats['checked'] == 2
     assert filters.stats['archived'] == 1
     assert filters.stats['kept'] == 1
+
+def test_sender_verdict_cached_per_sender():
+    """Repeat senders should reuse the whitelist/blacklist verdict"""
+    filters = FilterEngine(config_file=None)
+    filters.config['blacklist'] = ['@spam.com']
+    
+    for i in range(5):
+        should_archive, reason = filters.should_archive(
+            {'from': 'ads@spam.com', 'subject': f'offer {i}', 'snippet': ''})
+        assert should_archive == True
+    
+    assert filters.stats['sender_cache_hits'] == 4
+    assert filters.stats['archived'] == 5
+
+def test_sender_cache_ignores_display_name():
+    """Display-name variants of one address should share a cache entry"""
+    filters = FilterEngine(config_file=None)
+    filters.config['blacklist'] = ['@spam.com']
+    
+    for sender in ('ads@spam.com', 'Ads <ads@spam.com>', '"Big Sale" <ADS@spam.com>'):
+        assert filters.sender_verdict(sender)[0] == True
+    
+    assert filters.stats['sender_cache_hits'] == 2
+    assert len(filters._sender_verdicts) == 1
+
+def test_repeat_header_skips_address_parsing(monkeypatch):
+    """A From header seen before should be answered without parseaddr"""
+    import src.filters
+    calls = []
+    real = src.filters.parseaddr
+    monkeypatch.setattr(src.filters, 'parseaddr', lambda value: calls.append(value) or real(value))
+    filters = FilterEngine(config_file=None)
+    filters.config['blacklist'] = ['@spam.com']
+    
+    for _ in range(5):
+        filters.sender_verdict('Ads <ads@spam.com>')
+    
+    assert calls == ['Ads <ads@spam.com>']
+
+def test_sender_cache_dropped_when_lists_change():
+    """Editing the blacklist should take effect for cached senders"""
+    filters = FilterEngine(config_file=None)
+    msg = {'from': 'ads@spam.com', 'subject': 'hello', 'snippet': ''}
+    
+    assert filters.should_archive(msg)[0] == False
+    filters.config['blacklist'] = ['@spam.com']
+    
+    assert filters.should_archive(msg)[0] == True
+
+def test_date_parsing_matches_strptime():
+    """The hand-rolled Date parser should agree with strptime and fall back to it"""
+    from datetime import datetime
+    from src.filters import _parse_date
+    
+    for value in ('Tue, 14 Nov 2023 22:13:20 +0000', 'Mon, 1 Jan 2024 12:00:00 -0530'):
+        assert _parse_date(value) == datetime.strptime(value, '%a, %d %b %Y %H:%M:%S %z')
+    for value in ('Tue, 14 Nov 2023 22:13:20 GMT', 'garbage'):
+        with pytest.raises(ValueError):
+            _parse_date(value)
+
+def test_fixed_now_drives_age_rule():
+    """An engine with `now` set should age messages against it, not the clock"""
+    from datetime import datetime, timezone
+    filters = FilterEngine(config_file=None)
+    filters.now = datetime(2024, 3, 1, tzinfo=timezone.utc)
+    msg = {'from': 'a@b.com', 'subject': 'hi', 'snippet': '', 'date': 'Mon, 1 Jan 2024 12:00:00 +0000'}
+    
+    assert filters.should_archive(msg) == (True, 'older than 30 days')
+    filters.now = datetime(2024, 1, 15, tzinfo=timezone.utc)
+    assert filters.should_archive(msg) == (False, 'no rules matched')
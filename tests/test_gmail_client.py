@@ -0,0 +1,91 @@
+"""Tests for GmailClient against the in-memory fake service"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.gmail_client import GmailClient
+from src.scheduler import SanitizerScheduler
+from tests.fake_gmail import DAY, NOW, FakeGmailService, make_filters, make_inbox
+
+def test_list_messages_follows_page_tokens():
+    """Should keep requesting pages until max_results is reached"""
+    service = make_inbox(1200, spacing=60)
+    client = GmailClient(service)
+    
+    messages = client.list_messages('in:inbox', max_results=1100)
+    
+    assert len(messages) == 1100
+    assert service.count('list') == 3
+
+def test_partition_query_windows_are_disjoint_and_complete():
+    """Every message should land in exactly one window"""
+    service = make_inbox(1200, spacing=DAY // 3)
+    client = GmailClient(service)
+    
+    windows = client.partition_query('in:inbox', workers=4, now=NOW)
+    
+    ids = []
+    for query in windows:
+        ids.extend(m['id'] for m in client.list_messages(query, max_results=1000))
+    assert len(windows) > 4
+    assert sorted(ids) == sorted(service.store)
+
+def test_partition_query_sizes_windows_from_estimate():
+    """No bisectable window should hold more than the per-worker share"""
+    service = make_inbox(1200, spacing=DAY // 3)
+    client = GmailClient(service)
+    
+    windows = client.partition_query('in:inbox', workers=4, now=NOW)
+    
+    sizes = [client.estimate_count(q) for q in windows[:-1]]
+    assert max(sizes) <= 300
+
+def test_partition_query_skips_single_page():
+    """A query that fits in one list page should not be bisected at all"""
+    service = make_inbox(400, spacing=DAY)
+    client = GmailClient(service)
+    
+    assert client.partition_query('in:inbox', workers=4, now=NOW) == ['in:inbox']
+    assert client.partition_query('in:inbox', workers=4, max_results=100) == ['in:inbox']
+    assert service.count('list') == 2
+
+def test_worker_threads_use_service_factory():
+    """Threads other than the main one should get their own service"""
+    service = make_inbox(600)
+    created = []
+    
+    def factory():
+        created.append(FakeGmailService())
+        created[-1].store = service.store
+        return created[-1]
+    
+    client = GmailClient(service, service_factory=factory)
+    SanitizerScheduler(client, make_filters()).run_once(max_messages=600, dry_run=True, workers=2)
+    
+    assert created
+    assert all(s.count('list') for s in created)
+
+def test_get_message_requests_only_needed_fields():
+    """The field mask should shrink the metadata payload but keep the record intact"""
+    service = make_inbox(1)
+    client = GmailClient(service)
+    
+    full = service.users().messages().get(userId='me', id='m0', format='metadata').execute()
+    full_bytes = service.bytes_returned
+    service.bytes_returned = 0
+    msg = client.get_message('m0')
+    
+    assert service.bytes_returned < full_bytes * 0.6
+    assert msg['from'] == 'ads@spam.com'
+    assert msg['threadId'] == full['threadId']
+
+def test_list_messages_mask_keeps_thread_ids():
+    """List pages should carry only IDs, thread IDs and the page token"""
+    service = make_inbox(3)
+    client = GmailClient(service)
+    
+    messages = client.list_messages('in:inbox', max_results=10)
+    
+    assert messages[0] == {'id': 'm0', 'threadId': 'm0'}
+    assert service.bytes_returned < 150
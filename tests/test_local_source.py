@@ -0,0 +1,121 @@
+"""Tests for reading mbox files and Maildirs as a message source"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from src.local_source import LocalMailClient
+from src.scheduler import SanitizerScheduler
+from tests.fake_gmail import make_filters
+
+MBOX = b"""From 1234@xxx Mon Jan 01 00:00:00 2024
+X-GM-THRID: 111
+X-Gmail-Labels: Inbox,Important
+From: Friend <friend@example.com>
+Subject: Lunch?
+Date: Mon, 01 Jan 2024 12:00:00 +0000
+
+Are you free?
+>From the office, probably.
+
+From 5678@xxx Mon Jan 01 00:00:00 2024
+X-GM-THRID: 222
+X-Gmail-Labels: Inbox
+From: ads@spam.com
+Subject: =?utf-8?q?Big_sale_=E2=9C=93?=
+Date: Tue, 02 Jan 2024 12:00:00 +0000
+
+Buy now.
+
+From 9999@xxx Mon Jan 01 00:00:00 2024
+X-GM-THRID: 333
+X-Gmail-Labels: Archived
+From: old@example.com
+Subject: Already archived
+Date: Wed, 03 Jan 2024 12:00:00 +0000
+
+Bye.
+"""
+
+@pytest.fixture
+def mbox_path(tmp_path):
+    path = tmp_path / 'Inbox.mbox'
+    path.write_bytes(MBOX)
+    return str(path)
+
+@pytest.fixture
+def maildir_path(tmp_path):
+    for sub in ('new', 'cur', 'tmp'):
+        (tmp_path / sub).mkdir()
+    (tmp_path / 'new' / '1.host').write_bytes(
+        b"From: a@example.com\nSubject: First\nDate: Mon, 01 Jan 2024 12:00:00 +0000\n\nBody\n")
+    (tmp_path / 'cur' / '2.host:2,S').write_bytes(
+        b"From: newsletter@news.com\r\nSubject: Weekly digest\r\n\r\nBody\r\n")
+    return str(tmp_path)
+
+def test_mbox_records_match_gmail_format(mbox_path):
+    """Records should have exactly the keys GmailClient.get_message returns"""
+    client = LocalMailClient(mbox_path)
+    
+    records = list(client.iter_messages())
+    
+    assert len(records) == 3
+    assert set(records[0]) == {'id', 'threadId', 'snippet', 'from', 'subject', 'date'}
+    assert records[0]['from'] == 'Friend <friend@example.com>'
+    assert records[0]['threadId'] == '111'
+    assert records[1]['subject'] == 'Big sale ✓'
+
+def test_unescaped_from_lines_in_body_are_not_separators(tmp_path):
+    """Only a dated From_ line at the start or after a blank line splits messages"""
+    path = tmp_path / 'Inbox.mbox'
+    path.write_bytes(MBOX.replace(
+        b">From the office, probably.\n",
+        b"From the office, probably.\n\nFrom here on, lunch is on me.\n"
+    ).replace(b"\n\nFrom 9999@xxx", b"\r\n\r\nFrom 9999@xxx"))
+    client = LocalMailClient(str(path))
+    
+    records = list(client.iter_messages())
+    
+    assert [r['subject'] for r in records] == ['Lunch?', 'Big sale ✓', 'Already archived']
+
+def test_mbox_get_message_by_offset(mbox_path):
+    """IDs from list_messages should round-trip through get_message"""
+    client = LocalMailClient(mbox_path)
+    
+    listed = client.list_messages('in:inbox', max_results=10)
+    
+    assert [m['threadId'] for m in listed] == ['111', '222']
+    assert client.get_message(listed[1]['id'])['from'] == 'ads@spam.com'
+
+def test_maildir_reads_new_and_cur(maildir_path):
+    """Both new/ and cur/ messages should be listed"""
+    client = LocalMailClient(maildir_path)
+    
+    subjects = [m['subject'] for m in client.iter_messages()]
+    
+    assert subjects == ['First', 'Weekly digest']
+
+def test_check_pipeline_runs_over_mbox(mbox_path):
+    """run_once in dry-run mode should work unchanged on a local source"""
+    scheduler = SanitizerScheduler(LocalMailClient(mbox_path), make_filters())
+    
+    results = scheduler.run_once(max_messages=10, dry_run=True)
+    
+    assert results['processed'] == 2
+    assert results['archived'] == 1
+
+def test_list_messages_filters_by_sender(mbox_path):
+    """from: queries should only list the named senders, as Gmail does"""
+    client = LocalMailClient(mbox_path)
+    
+    listed = client.list_messages('in:inbox from:(nobody@x.com OR ADS@spam.com)', max_results=10)
+    single = client.list_messages('from:friend@example.com', max_results=10)
+    
+    assert [m['threadId'] for m in listed] == ['222']
+    assert [m['threadId'] for m in single] == ['111']
+
+def test_missing_path_raises(tmp_path):
+    """A path that is neither file nor directory should fail clearly"""
+    with pytest.raises(FileNotFoundError):
+        LocalMailClient(str(tmp_path / 'nope.mbox'))
@@ -0,0 +1,127 @@
+"""Tests for the learned sender reputation table"""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.filters import FilterEngine
+from src.reputation import SenderReputation
+from src.scheduler import KNOWN_SENDER_QUERIES
+from tests.fake_gmail import FakeGmailService, make_filters, make_scheduler
+
+def learning_filters(path, **config):
+    filters = make_filters(**config)
+    filters.use_reputation(SenderReputation(str(path), min_messages=3))
+    return filters
+
+def test_blacklisted_sender_learned(tmp_path):
+    """Enough blacklist verdicts make a sender a known archive sender"""
+    filters = learning_filters(tmp_path / 'rep.json', blacklist=['@shop.com'])
+    msg = {'from': 'Deals <deals@shop.com>', 'subject': 'Weekly digest', 'snippet': ''}
+    
+    filters.should_archive(msg)
+    filters.should_archive(msg)
+    assert filters.reputation.archive_senders() == []
+    
+    # The rules still decide every message; the table only learns
+    assert filters.should_archive(msg) == (True, 'blacklisted domain: @shop.com')
+    assert filters.reputation.archive_senders() == ['deals@shop.com']
+
+def test_message_rules_are_not_learned(tmp_path):
+    """Newsletter verdicts depend on the message, so they never reach the table"""
+    filters = learning_filters(tmp_path / 'rep.json')
+    msg = {'from': 'deals@shop.com', 'subject': 'Weekly digest', 'snippet': ''}
+    
+    for _ in range(5):
+        filters.should_archive(msg)
+    
+    assert 'deals@shop.com' not in filters.reputation.senders
+
+def test_aged_out_sender_still_evaluated(tmp_path):
+    """Old mail archived by the default age rule must not condemn a sender"""
+    service = FakeGmailService()
+    for i in range(12):
+        service.add(f"old{i}", sender='Boss <boss@work.com>', subject='Status',
+                    timestamp=int(time.time()) - (60 + i) * 86400)
+    filters = FilterEngine(config_file=None)
+    filters.use_reputation(SenderReputation(str(tmp_path / 'rep.json')))
+    scheduler = make_scheduler(service, filters)
+    
+    assert scheduler.run_once(max_messages=100)['archived'] == 12
+    service.add('urgent', sender='Boss <boss@work.com>', subject='Urgent: call me',
+                timestamp=int(time.time()))
+    results = scheduler.run_once(max_messages=100)
+    
+    assert results['archived'] == 0
+    assert service.count('get') == 13
+    assert 'INBOX' in service.store['urgent']['labelIds']
+
+def test_unmatched_keeps_are_not_trusted(tmp_path):
+    """Senders kept only because no rule matched must still be evaluated"""
+    filters = learning_filters(tmp_path / 'rep.json')
+    msg = {'from': 'friend@example.com', 'subject': 'Hi', 'snippet': ''}
+    
+    for _ in range(5):
+        filters.should_archive(msg)
+    
+    assert filters.reputation.archive_senders() == []
+
+def test_table_persists_and_resets_on_rule_change(tmp_path):
+    """A saved table reloads under the same rules and is dropped otherwise"""
+    path = tmp_path / 'rep.json'
+    filters = learning_filters(path)
+    for _ in range(3):
+        filters.should_archive({'from': 'ads@spam.com', 'subject': '', 'snippet': ''})
+    filters.reputation.save()
+    
+    same = learning_filters(path)
+    changed = learning_filters(path, blacklist=[])
+    
+    assert same.reputation.archive_senders() == ['ads@spam.com']
+    assert changed.reputation.senders == {}
+
+def test_eviction_bounds_table_size(tmp_path):
+    """The table should never grow past max_senders"""
+    reputation = SenderReputation(str(tmp_path / 'rep.json'), max_senders=50)
+    
+    for i in range(200):
+        reputation.record(f"user{i}@example.com", True, 'blacklisted domain: x')
+    
+    assert len(reputation.senders) <= 50
+
+def test_known_senders_archived_without_fetch(tmp_path):
+    """Confident archive senders are listed with from: and never fetched"""
+    service = FakeGmailService()
+    for i in range(6):
+        service.add(f"s{i}", sender='promo@shop.com', subject='Big sale', timestamp=1700000000 - i)
+    service.add('f0', sender='friend@example.com', subject='Hi', timestamp=1699990000)
+    filters = learning_filters(tmp_path / 'rep.json', blacklist=['@shop.com'])
+    for _ in range(3):
+        filters.should_archive({'from': 'promo@shop.com', 'subject': 'sale', 'snippet': ''})
+    scheduler = make_scheduler(service, filters)
+    
+    results = scheduler.run_once(max_messages=100)
+    
+    assert results['processed'] == 7
+    assert results['archived'] == 6
+    assert service.count('get') == 1
+    assert os.path.exists(tmp_path / 'rep.json')
+
+def test_known_sender_queries_are_bounded(tmp_path):
+    """A large table costs a fixed number of list calls, most recent senders first"""
+    service = FakeGmailService()
+    service.add('m0', sender='sender999@spam.com', subject='Sale', timestamp=1700000000)
+    service.add('m1', sender='sender0@spam.com', subject='Sale', timestamp=1700000000)
+    filters = learning_filters(tmp_path / 'rep.json')
+    for i in range(1000):
+        filters.reputation.record(f"sender{i}@spam.com", True, 'blacklisted domain: @spam.com')
+        filters.reputation.senders[f"sender{i}@spam.com"].update(archive=3, seen=i)
+    scheduler = make_scheduler(service, filters)
+    
+    results = scheduler.run_once(max_messages=100)
+    
+    assert service.count('list') == KNOWN_SENDER_QUERIES + 1
+    assert results['archived'] == 2
+    # sender999 was queried; sender0 was too stale and went through the rules
+    assert service.count('get') == 1
@@ -0,0 +1,191 @@
+"""Tests for SanitizerScheduler against the in-memory fake service"""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.scheduler import AdaptiveInterval
+from tests.fake_gmail import DAY, NOW, FakeGmailService, make_inbox, make_scheduler
+
+def test_run_once_archives_matches():
+    """Blacklisted senders should be archived, others kept"""
+    service = make_inbox(30, spacing=DAY // 2)
+    scheduler = make_scheduler(service)
+    
+    results = scheduler.run_once(max_messages=100)
+    
+    assert results['processed'] == 30
+    assert results['archived'] == 10
+    assert service.count('modify') == 10
+
+def test_run_once_dry_run_modifies_nothing():
+    """Dry runs should report but never call modify"""
+    service = make_inbox(30, spacing=DAY // 2)
+    scheduler = make_scheduler(service)
+    
+    results = scheduler.run_once(max_messages=100, dry_run=True)
+    
+    assert results['archived'] == 10
+    assert service.count('modify') == 0
+
+def test_partitioned_run_matches_serial_run():
+    """Parallel date windows should process every message exactly once"""
+    service = make_inbox(1200, spacing=DAY // 2)
+    scheduler = make_scheduler(service)
+    
+    results = scheduler.run_once(max_messages=2000, dry_run=True, workers=4)
+    
+    assert results['processed'] == 1200
+    assert results['archived'] == 400
+    assert service.count('get') == 1200
+
+def test_partitioned_run_respects_max_messages():
+    """The message cap should hold across all windows"""
+    service = make_inbox(1200, spacing=DAY // 2)
+    scheduler = make_scheduler(service)
+    
+    results = scheduler.run_once(max_messages=700, dry_run=True, workers=4)
+    
+    assert results['processed'] == 700
+    assert service.count('get') == 700
+
+def test_adaptive_interval_shortens_for_busy_inbox():
+    """A high arrival rate should pull the interval toward the minimum"""
+    interval = AdaptiveInterval(min_minutes=5, max_minutes=60, target_new=25)
+    
+    interval.update(new_messages=100, elapsed_minutes=60, tick_seconds=1)
+    
+    assert interval.current == 15
+    interval.update(new_messages=600, elapsed_minutes=15, tick_seconds=1)
+    assert interval.current == 5
+
+def test_adaptive_interval_lengthens_for_quiet_inbox():
+    """Empty sweeps should back off to the maximum"""
+    interval = AdaptiveInterval(min_minutes=5, max_minutes=60)
+    interval.current = 10
+    
+    interval.update(new_messages=0, elapsed_minutes=10, tick_seconds=1)
+    
+    assert interval.current == 20
+    assert interval.stats()['recent_intervals'] == [20]
+
+def test_adaptive_interval_leaves_room_for_slow_ticks():
+    """The gap should be at least cost_factor times the tick duration"""
+    interval = AdaptiveInterval(min_minutes=1, max_minutes=60, cost_factor=4)
+    
+    interval.update(new_messages=1000, elapsed_minutes=1, tick_seconds=300)
+    
+    assert interval.current == 20
+
+def test_run_forever_sleeps_until_next_due_run(capsys):
+    """The daemon should sleep once per tick for exactly the remaining gap"""
+    service = make_inbox(10, spacing=DAY // 2)
+    scheduler = make_scheduler(service)
+    now = [0.0]
+    sleeps = []
+    
+    def fake_sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 3:
+            raise KeyboardInterrupt
+        now[0] += seconds
+    
+    scheduler.clock = lambda: now[0]
+    scheduler.sleep = fake_sleep
+    scheduler.run_forever(interval_minutes=60, min_interval_minutes=5)
+    
+    assert scheduler.runs_completed == 3
+    assert sleeps == [3600, 3600, 3600]
+    assert scheduler.interval.stats()['interval_minutes'] == 60
+    assert 'Archived 4 of 10 messages' in capsys.readouterr().out
+
+def make_threaded_service():
+    """Two 3-message threads that match, one thread that is partly kept"""
+    service = FakeGmailService()
+    for i in range(3):
+        service.add(f"a{i}", sender='ads@spam.com', thread_id='ta', timestamp=NOW - i)
+        service.add(f"b{i}", sender='deals@spam.com', thread_id='tb', timestamp=NOW - 10 - i)
+    service.add('c0', sender='ads@spam.com', thread_id='tc', timestamp=NOW - 20)
+    service.add('c1', sender='friend@example.com', thread_id='tc', timestamp=NOW - 21)
+    return service
+
+def test_matching_threads_archived_with_one_call():
+    """Threads where every message matches should use threads().modify"""
+    service = make_threaded_service()
+    scheduler = make_scheduler(service)
+    
+    results = scheduler.run_once(max_messages=100)
+    
+    assert results['archived'] == 7
+    assert service.count('threads.modify') == 2
+    assert service.count('modify') == 1
+    assert results['actions'] == 3
+    assert 'INBOX' in service.store['c1']['labelIds']
+    assert all('INBOX' not in service.store[f"a{i}"]['labelIds'] for i in range(3))
+
+def test_reply_after_listing_keeps_thread_call_off():
+    """A reply that lands mid-run must not be archived with its thread"""
+    service = make_threaded_service()
+    scheduler = make_scheduler(service)
+    evaluate = scheduler._evaluate
+    
+    def evaluate_then_reply(msg_data):
+        if 'reply' not in service.store:
+            service.add('reply', sender='friend@example.com', thread_id='ta',
+                        timestamp=int(time.time()))
+        return evaluate(msg_data)
+    
+    scheduler._evaluate = evaluate_then_reply
+    results = scheduler.run_once(max_messages=100)
+    
+    assert results['archived'] == 7
+    assert service.count('threads.modify') == 1
+    assert service.count('modify') == 4
+    assert 'INBOX' in service.store['reply']['labelIds']
+
+def test_truncated_listing_archives_per_message():
+    """If the listing hit max_messages, unseen thread members must be kept safe"""
+    service = make_threaded_service()
+    scheduler = make_scheduler(service)
+    
+    scheduler.run_once(max_messages=6)
+    
+    assert service.count('threads.modify') == 0
+    assert service.count('modify') == 6
+
+def test_repeat_senders_evaluated_once():
+    """The sender rules should run once per distinct sender"""
+    service = make_threaded_service()
+    scheduler = make_scheduler(service)
+    
+    scheduler.run_once(max_messages=100, dry_run=True)
+    
+    assert scheduler.filters.stats['sender_cache_hits'] == 5
+
+def test_partitioned_run_keeps_list_calls_low():
+    """A small cap on a large inbox should not bisect the whole history"""
+    service = FakeGmailService()
+    for i in range(3000):
+        service.add(f"m{i}", timestamp=NOW - i * 3600)
+    scheduler = make_scheduler(service)
+    
+    results = scheduler.run_once(max_messages=100, dry_run=True, workers=4)
+    
+    assert results['processed'] == 100
+    assert service.count('get') == 100
+    assert service.count('list') <= 40
+    assert scheduler.gmail.quota_used <= 5 * (40 + 100)
+
+def test_backlog_sliding_into_view_is_not_new_mail():
+    """Only messages dated after the last run's newest should count as arrivals"""
+    service = FakeGmailService()
+    for i in range(30):
+        service.add(f"m{i}", sender='ads@spam.com', timestamp=NOW - i * DAY)
+    scheduler = make_scheduler(service)
+    
+    assert scheduler.run_once(max_messages=10)['new'] == 10
+    assert scheduler.run_once(max_messages=10)['new'] == 0
+    
+    service.add('fresh', sender='ads@spam.com', timestamp=NOW + 60)
+    assert scheduler.run_once(max_messages=10)['new'] == 1
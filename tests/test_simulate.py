@@ -0,0 +1,64 @@
+"""Tests for offline what-if simulation of filter configs"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from src.simulate import _shard_ranges, format_report, save_corpus, simulate
+
+RECORDS = [
+    {'id': 'a', 'threadId': 'a', 'snippet': '', 'from': 'ads@spam.com', 'subject': 'Deals', 'date': ''},
+    {'id': 'b', 'threadId': 'b', 'snippet': '', 'from': 'boss@work.com', 'subject': 'Report', 'date': ''},
+    {'id': 'c', 'threadId': 'c', 'snippet': '', 'from': 'news@paper.com', 'subject': 'Daily briefing', 'date': ''},
+    {'id': 'd', 'threadId': 'd', 'snippet': '', 'from': 'friend@example.com', 'subject': 'Hi', 'date': ''},
+]
+
+@pytest.fixture
+def corpus(tmp_path):
+    path = tmp_path / 'corpus.jsonl'
+    save_corpus(RECORDS * 25, str(path))
+    return str(path)
+
+@pytest.fixture
+def configs(tmp_path):
+    baseline = tmp_path / 'baseline.yaml'
+    baseline.write_text("blacklist: ['@spam.com']\n")
+    candidate = tmp_path / 'candidate.yaml'
+    candidate.write_text("blacklist: ['@spam.com', '@work.com']\nwhitelist: ['@paper.com']\n")
+    return [str(baseline), str(candidate)]
+
+def test_shard_ranges_cover_file_on_line_boundaries(corpus):
+    """Shards should be contiguous and split only after newlines"""
+    ranges = _shard_ranges(corpus, 7)
+    data = open(corpus, 'rb').read()
+    
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start and data[end - 1:end] == b'\n'
+
+def test_simulate_reports_changed_verdicts(corpus, configs):
+    """Messages that flip between configs should be listed with reasons"""
+    report = simulate(corpus, configs, workers=2)
+    
+    assert report['total'] == 100
+    assert report['configs'][0]['archived'] == 50
+    assert report['configs'][1]['archived'] == 50
+    flipped = {c['id'] for c in report['changed']}
+    assert flipped == {'b', 'c'}
+    assert len(report['changed']) == 50
+
+def test_simulate_counts_rule_hits(corpus, configs):
+    """Each config should report how often each rule fired"""
+    report = simulate(corpus, configs, workers=2)
+    
+    hits = report['configs'][1]['rule_hits']
+    assert hits['blacklisted domain: @work.com'] == 25
+    assert hits['whitelisted domain: @paper.com'] == 25
+
+def test_format_report_summarises_diff(corpus, configs):
+    """The text report should show per-candidate change counts"""
+    text = format_report(simulate(corpus, configs, workers=2), limit=1)
+    
+    assert '50 changed (25 newly archived, 25 newly kept)' in text
+    assert '... and 49 more' in text
@@ -0,0 +1,132 @@
+"""Tests for the skip index of kept messages"""
+
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.events import EventLog
+from src.skip_index import SkipIndex
+from tests.fake_gmail import DAY, NOW, FakeGmailService, make_filters, make_scheduler
+
+def make_index(path=None, capacity=1000):
+    index = SkipIndex(path, capacity=capacity)
+    index.clock = lambda: NOW
+    index._clear()
+    return index
+
+def test_add_and_expire():
+    """IDs match until their expiry hour, permanent ones always"""
+    index = make_index()
+    index.add('soon', NOW + 2 * 3600)
+    index.add('later', NOW + 10 * DAY)
+    index.add('forever')
+    
+    assert 'soon' in index and 'later' in index and 'forever' in index
+    assert 'never-added' not in index
+    
+    index.clock = lambda: NOW + 3 * 3600
+    assert 'soon' not in index
+    assert 'later' in index and 'forever' in index
+    
+    index.clock = lambda: NOW + 11 * DAY
+    index.expire()
+    assert 'later' not in index
+    assert 'forever' in index
+    assert len(index) == 1
+
+def test_due_within_the_hour_is_not_indexed():
+    """A verdict about to change should keep being evaluated"""
+    index = make_index()
+    index.add('due', NOW + 60)
+    
+    assert 'due' not in index
+    assert len(index) == 0
+
+def test_grows_past_capacity_and_stays_compact():
+    """Going past capacity adds a table; memory stays a few bytes per ID"""
+    index = make_index(capacity=1000)
+    for i in range(5000):
+        index.add(f"id{i}", NOW + (i % 30 + 1) * DAY)
+    
+    assert len(index.tables) > 1
+    assert all(f"id{i}" in index for i in range(5000))
+    misses = sum(1 for i in range(5000, 25000) if f"id{i}" in index)
+    assert misses < 20
+    assert index.nbytes / 5000 < 16
+
+def test_save_load_and_invalidate(tmp_path):
+    """The index survives a restart and is dropped when the rules change"""
+    path = str(tmp_path / 'skip.bin')
+    index = make_index(path)
+    index.invalidate('rules-a')
+    index.add('kept', NOW + 5 * DAY)
+    index.add('whitelisted')
+    index.save()
+    
+    loaded = SkipIndex(path)
+    loaded.clock = lambda: NOW
+    assert loaded.rules_hash == 'rules-a'
+    assert 'kept' in loaded and 'whitelisted' in loaded
+    
+    loaded.invalidate('rules-b')
+    assert 'kept' not in loaded and 'whitelisted' not in loaded
+
+def test_keep_expiry():
+    """Only the age rule puts an end date on a keep verdict"""
+    filters = make_filters(max_age_days=30)
+    msg = {'from': 'a@b.com', 'date': 'Tue, 14 Nov 2023 22:13:20 +0000'}
+    
+    assert filters.keep_expiry(msg, 'no rules matched') == NOW + 31 * DAY
+    assert filters.keep_expiry(msg, 'whitelisted domain: b.com') is None
+    assert filters.keep_expiry({'date': 'garbage'}, 'no rules matched') is None
+
+def _shifted_datetime(seconds):
+    """datetime class whose now() runs `seconds` ahead"""
+    class Shifted(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.now(tz) + timedelta(seconds=seconds)
+    return Shifted
+
+def test_scheduler_skips_kept_messages_until_they_age(monkeypatch):
+    """Kept messages are not fetched again until the age rule could archive them"""
+    now = time.time()
+    service = FakeGmailService()
+    service.add('spam', sender='ads@spam.com', timestamp=int(now))
+    service.add('friend', sender='friend@example.com', timestamp=int(now) - 5 * DAY)
+    service.add('boss', sender='boss@work.com', timestamp=int(now))
+    scheduler = make_scheduler(service, make_filters(whitelist=['work.com'], max_age_days=7))
+    scheduler.skip_index = SkipIndex(None)
+    
+    first = scheduler.run_once(max_messages=100)
+    assert first['archived'] == 1
+    assert service.count('get') == 3
+    
+    second = scheduler.run_once(max_messages=100)
+    assert second['skipped'] == 2
+    assert second['processed'] == 0
+    assert service.count('get') == 3
+    
+    # Three days on, the 5-day-old message has crossed the 7-day rule
+    ahead = 3 * DAY + 3600
+    scheduler.skip_index.clock = lambda: now + ahead
+    monkeypatch.setattr('src.filters.datetime', _shifted_datetime(ahead))
+    third = scheduler.run_once(max_messages=100)
+    
+    assert third['skipped'] == 1
+    assert third['archived'] == 1
+    assert service.store['friend']['labelIds'] == []
+    assert service.count('get') == 4
+
+def test_save_errors_become_events(tmp_path):
+    """A failed save should be reported through the event log"""
+    events = EventLog()
+    index = SkipIndex(str(tmp_path / 'missing' / 'index.bin'), events=events)
+    index.add('kept')
+    
+    index.save()
+    
+    assert events.summary.error_count == 1
+    assert not list(tmp_path.iterdir())